@@ -1,19 +1,143 @@
 # app.py
-from flask import Flask, render_template, request, send_from_directory
-from utils import validate_inputs, calculate_macros, get_meal_plan, safe_load_model
+from flask import (
+    Flask, Response, abort, g, render_template, render_template_string, request, send_from_directory, jsonify,
+    stream_with_context,
+)
+from utils import validate_inputs, coerce_number, safe_load_model, load_food_index, MEAL_WEIGHTS
+from meal_optimizer import iter_meal_plans, MAX_PLAN_DAYS, VARIETY_DAYS
+from plan_pool import (POOL_PROCESSES, RETRY_AFTER, PoolSaturated, PoolTimeout, plan_profile, profile_targets,
+                       start_pool)
+from batch import predict_batch, MAX_BATCH_SIZE
+from food_index import FoodIndex
+from warmup import Warmup
+from cache import make_cache
+from catalog import make_catalog, SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from portions import portion_items
+from build_assets import STATIC_DIR, IMMUTABLE, built_files, load_manifest, pick_variant
+from metrics import REGISTRY, REQUEST_SECONDS, SERVER_TIMING, span, server_timing_header
 import os
+import json
+import mimetypes
+import multiprocessing
+import time
+import random
+import hashlib
+from functools import lru_cache
 
-# Flask must know your templates are in ROOT
-app = Flask(__name__, template_folder='.', static_folder='.')
+# Flask must know your templates are in ROOT. Static files are only the
+# built assets in static/ (serve_asset below), never the project root.
+app = Flask(__name__, template_folder='.', static_folder=None)
 
-# Load Model (Optional)
-MODEL = safe_load_model("calorie_model.pkl")
+# Model (optional) and food index load in the background; until they are
+# ready requests get curated-only plans and no ML prediction. With
+# FITFUEL_PLAN_POOL set, the plan process pool starts once both are loaded
+# (requests are planned in-process until then).
+WARMUP = Warmup({
+    "model": safe_load_model,
+    "food_index": load_food_index,
+    **({"plan_pool": lambda: start_pool(WARMUP.get("food_index"), WARMUP.get("model"))} if POOL_PROCESSES else {}),
+})
+# Not in processes started by multiprocessing: pool children re-import the
+# main module (`python app.py`) and map their own data, and uvicorn --workers
+# starts warm-up from the ASGI lifespan (every worker also starts it on its
+# first request, below)
+if multiprocessing.parent_process() is None:
+    WARMUP.start()
+
+EMPTY_INDEX = FoodIndex.empty()
+
+# "optimize" fits items + portions to the calorie/macro targets;
+# "random" keeps the original one-random-pick-per-meal planner.
+PLANNER = os.environ.get("FITFUEL_PLANNER", "optimize")
+
+# Opt-in: seed meal selection from the profile so repeat submissions get the
+# same plan, and cache the rendered page.
+DETERMINISTIC_PLANS = os.environ.get("FITFUEL_DETERMINISTIC_PLANS", "0") == "1"
+PLAN_CACHE = make_cache()
+
+# Searchable foods for /foods/search (SQLite file from `python catalog.py`)
+CATALOG = make_catalog()
+
+
+def current_food_index():
+    return WARMUP.get("food_index") or EMPTY_INDEX
+
+
+def close_plan_pool():
+    """Stop this worker's plan pool, if any (server shutdown hooks: asgi.py, gunicorn.conf.py)."""
+    pool = WARMUP.get("plan_pool") if POOL_PROCESSES else None
+    if pool is not None:
+        pool.close()
+
+
+@app.before_request
+def ensure_warmup():
+    g.request_start = time.perf_counter()
+    WARMUP.start()
+
+
+@app.after_request
+def record_request(response):
+    start = g.get("request_start")
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        status = response.status_code
+        # Observed when the body is done: streamed responses (/api/plan/days)
+        # are still being produced when after_request runs
+        response.call_on_close(
+            lambda: REQUEST_SECONDS.observe(time.perf_counter() - start, route=route, status=status))
+        if SERVER_TIMING:
+            response.headers["Server-Timing"] = server_timing_header(time.perf_counter() - start)
+    return response
+
+
+@REGISTRY.collector
+def _cache_and_warmup_metrics():
+    stats = PLAN_CACHE.stats()
+    lines = ["# HELP fitfuel_plan_cache_total Plan cache lookups, evictions and backend errors.",
+             "# TYPE fitfuel_plan_cache_total counter"]
+    for result in ("hits", "misses", "evictions", "errors"):
+        lines.append(f'fitfuel_plan_cache_total{{result="{result}"}} {stats[result]}')
+    lines += ["# HELP fitfuel_warmup_seconds Time taken to load each warm-up component.",
+              "# TYPE fitfuel_warmup_seconds gauge"]
+    for name, status in WARMUP.report()["components"].items():
+        if status["seconds"] is not None:
+            lines.append(f'fitfuel_warmup_seconds{{component="{name}",state="{status["state"]}"}} {status["seconds"]}')
+    lines += ["# HELP fitfuel_ready Whether warm-up has finished (1) or not (0).",
+              "# TYPE fitfuel_ready gauge", f"fitfuel_ready {int(WARMUP.ready)}"]
+    return lines
 
 
 # ---------------------------
-# SERVE ROOT CSS & JS FILES
+# STATIC ASSETS
 # ---------------------------
+# Built by `python build_assets.py`; read once per process.
+ASSET_MANIFEST = load_manifest()
+ASSET_FILES = built_files()
+HASHED_ASSETS = frozenset(ASSET_MANIFEST.values())
+
+
+@app.template_global()
+def asset_url(name):
+    """URL of a CSS/JS asset: the fingerprinted copy when built, else the plain route."""
+    hashed = ASSET_MANIFEST.get(name)
+    return f"/static/{hashed}" if hashed else f"/{name}"
+
+
+@app.route("/static/<path:filename>")
+def serve_asset(filename):
+    if filename not in HASHED_ASSETS:
+        abort(404)
+    path, encoding = pick_variant(filename, request.headers.get("Accept-Encoding"), ASSET_FILES)
+    response = send_from_directory(STATIC_DIR, path, mimetype=mimetypes.guess_type(filename)[0])
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
 
+
+# Unhashed fallbacks (no build step, e.g. local dev)
 @app.route('/style.css')
 def serve_css():
     return send_from_directory(os.path.dirname(__file__), "style.css")
@@ -23,77 +147,259 @@ def serve_js():
     return send_from_directory(os.path.dirname(__file__), "app.js")
 
 
+# ---------------------------
+# PRE-RENDERED PAGES
+# ---------------------------
+# The base.html layout around {% block content %} is the same on every
+# request and the bare index page never changes within a process, so both
+# are rendered once. Result pages only render result_body.html between the
+# layout halves, and meal cards come from a cache of rendered fragments.
+CONTENT_MARKER = "\x00fitfuel-content\x00"
+
+
+def _prerender():
+    with app.app_context():
+        layout = render_template_string(
+            '{% extends "base.html" %}{% block content %}' + CONTENT_MARKER + '{% endblock %}')
+        index_html = render_template("index.html").encode("utf-8")
+    head, tail = layout.split(CONTENT_MARKER)
+    return head, tail, index_html, hashlib.blake2b(index_html, digest_size=16).hexdigest()
+
+
+LAYOUT_HEAD, LAYOUT_TAIL, INDEX_HTML, INDEX_ETAG = _prerender()
+
+
+@lru_cache(maxsize=4096)
+def _meal_card_html(meal, items):
+    macro = app.jinja_env.get_template("meal_card.html").module.meal_card
+    return macro(meal, [{"name": n, "calories": c, "portion": p} for n, c, p in items])
+
+
+@app.template_global()
+def meal_card(meal, items):
+    """Rendered card for one meal of a plan (see meal_card.html), cached by its contents."""
+    return _meal_card_html(meal, tuple((it["name"], it["calories"], it["portion"]) for it in items))
+
+
+def render_result(result):
+    """
+    result.html for one build_result() dict, around the pre-rendered layout.
+    result_body.html only uses its own variables, so it is rendered straight
+    from the compiled template without Flask's per-render context setup.
+    """
+    body = app.jinja_env.get_template("result_body.html").render(meal_card=meal_card, **result)
+    return LAYOUT_HEAD + body + LAYOUT_TAIL
+
+
 # ---------------------------
 # ROUTES
 # ---------------------------
 
 @app.route("/")
 def index():
-    return render_template("index.html")
+    # Plain substring test: werkzeug's full If-None-Match parsing costs more than the page
+    etag = f'"{INDEX_ETAG}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    return Response(INDEX_HTML, mimetype="text/html", headers=headers)
+
+
+def build_result(data, rng=None):
+    """Everything result.html needs for one validated profile."""
+    pool = WARMUP.get("plan_pool") if POOL_PROCESSES else None
+    if pool is not None:
+        tdee, macros, meal_plan, totals, prediction = pool.run(data, rng, PLANNER)
+    else:
+        tdee, macros, meal_plan, totals, prediction = plan_profile(
+            data, current_food_index(), WARMUP.get("model"), rng, PLANNER)
+
+    return {
+        "tdee": tdee,
+        "calories": tdee,
+        "macros": macros,
+        "plan": meal_plan,
+        "totals": totals,
+        "prediction": prediction,
+        "user_data": data,
+    }
+
+
+def profile_key(data):
+    """Cache key for a validated profile (parsed values, so "70" == "70.0")."""
+    fields = ("weight", "height", "age", "gender", "activity", "goal", "diet")
+    return "plan:v2:" + "|".join(str(data[f]).strip() for f in fields)
+
+
+def profile_rng(key):
+    """Random seeded from a cache key: the same profile always gets the same plan."""
+    return random.Random(int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big"))
+
+
+@app.errorhandler(PoolSaturated)
+def pool_saturated(_):
+    return Response("Server busy, please retry shortly.", status=503, mimetype="text/plain",
+                    headers={"Retry-After": str(RETRY_AFTER)})
+
+
+@app.errorhandler(PoolTimeout)
+def pool_timeout(_):
+    return Response("Plan generation timed out, please retry.", status=504, mimetype="text/plain")
 
 
 @app.route("/predict", methods=["POST"])
 def predict():
     form = request.form
-    data, errors = validate_inputs(form)
+    with span("validate"):
+        data, errors = validate_inputs(form)
 
     if errors:
         return render_template("index.html", errors=errors, old=form)
 
-    # Inputs
-    weight = data["weight"]
-    height = data["height"]
-    age = data["age"]
-    gender = data["gender"]
+    if not DETERMINISTIC_PLANS:
+        result = build_result(data)
+        with span("render"):
+            return render_result(result)
 
-    # BMR (Mifflin–St Jeor)
-    if gender.lower().startswith("m"):
-        bmr = 10 * weight + 6.25 * height - 5 * age + 5
+    # Deterministic mode: same profile -> same seeded plan, served from cache.
+    # The plan is cached, not the page: pages link fingerprinted assets that
+    # change on every deploy, while a shared cache outlives deploys.
+    key = profile_key(data)
+    cached = PLAN_CACHE.get(key)
+    if cached is not None:
+        result = json.loads(cached)
     else:
-        bmr = 10 * weight + 6.25 * height - 5 * age - 161
-
-    # Activity Levels
-    activity = str(data["activity"]).lower()
-    if "sedentary" in activity: act_val = 1.2
-    elif "light" in activity: act_val = 1.375
-    elif "moderate" in activity: act_val = 1.55
-    elif "very" in activity: act_val = 1.725
-    elif "extra" in activity: act_val = 1.9
-    else: act_val = 1.2
-
-    tdee = int(bmr * act_val)
-
-    # Goal adjust
-    goal = str(data["goal"]).lower()
-    if "fat" in goal:
-        tdee -= 300
-    elif "muscle" in goal:
-        tdee += 300
-
-    tdee = max(1200, tdee)
-
-    # Macros and Meal Plan
-    macros = calculate_macros(tdee, goal=goal)
-    meal_plan = get_meal_plan(tdee, diet_pref=data["diet"], goal=goal)
-
-    # ML Prediction
-    prediction = None
-    if MODEL:
+        result = build_result(data, rng=profile_rng(key))
+        # Plans built before warm-up finishes use fallbacks; don't pin those
+        if WARMUP.ready:
+            PLAN_CACHE.set(key, json.dumps(result).encode("utf-8"))
+    with span("render"):
+        return render_result(result)
+
+
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch_api():
+    payload = request.get_json(silent=True)
+    profiles = payload.get("profiles") if isinstance(payload, dict) else None
+    if not isinstance(profiles, list):
+        return jsonify({"error": "Expected JSON body {\"profiles\": [...]}"}), 400
+    if len(profiles) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} profiles per batch"}), 413
+
+    results = predict_batch(profiles, model=WARMUP.get("model"), index=current_food_index())
+    return jsonify({"results": results})
+
+
+@app.route("/api/plan/days", methods=["POST"])
+def plan_days_api():
+    """
+    Multi-day plan as NDJSON: a header line ({tdee, macros, days}) then one
+    {day, plan, totals} line per day, each sent as soon as it is solved.
+    Accepts the /predict form fields (form or JSON) plus days and variety_days.
+    """
+    payload = request.get_json(silent=True)
+    form = payload if isinstance(payload, dict) else request.form
+    data, errors = validate_inputs(form)
+    try:
+        days = coerce_number(form.get("days", 7), int)
+        if not (1 <= days <= MAX_PLAN_DAYS): errors["days"] = f"Days 1-{MAX_PLAN_DAYS}"
+    except (TypeError, ValueError):
+        errors["days"] = "Invalid days"
+    try:
+        variety_days = coerce_number(form.get("variety_days", VARIETY_DAYS), int)
+        if not (0 <= variety_days <= MAX_PLAN_DAYS): errors["variety_days"] = f"Variety days 0-{MAX_PLAN_DAYS}"
+    except (TypeError, ValueError):
+        errors["variety_days"] = "Invalid variety_days"
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    _, tdee, macros = profile_targets(data)
+    rng = None
+    if DETERMINISTIC_PLANS:
+        rng = profile_rng(f"{profile_key(data)}|days={days}|variety={variety_days}")
+    plans = iter_meal_plans(tdee, macros, data["diet"], days=days, variety_days=variety_days,
+                            index=current_food_index(), rng=rng)
+
+    def lines():
+        yield json.dumps({"tdee": tdee, "macros": macros, "days": days}) + "\n"
+        for day in plans:
+            yield json.dumps(day) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+
+
+@app.route("/foods/search")
+def foods_search():
+    """
+    Food autocomplete for swapping one meal of a plan:
+        /foods/search?q=pan&diet=veg&meal=Lunch&kcal=550&limit=10
+    q matches word prefixes of food names; without q, the foods closest to
+    kcal are returned. With kcal, every result also carries the plan item
+    portioned to it, ready to replace the meal.
+    """
+    args = request.args
+    query = args.get("q", "").strip()
+    meal = args.get("meal") or None
+    errors = {}
+    try:
+        limit = int(args.get("limit", SEARCH_LIMIT))
+        if not (1 <= limit <= MAX_SEARCH_LIMIT): errors["limit"] = f"Limit 1-{MAX_SEARCH_LIMIT}"
+    except ValueError:
+        errors["limit"] = "Invalid limit"
+    kcal = None
+    if args.get("kcal"):
         try:
-            features = [[weight, height, age, 1 if gender.lower().startswith("m") else 0]]
-            prediction = MODEL.predict(features)[0]
-        except:
-            prediction = None
-
-    return render_template(
-        "result.html",
-        tdee=tdee,
-        calories=tdee,
-        macros=macros,
-        plan=meal_plan,
-        prediction=prediction,
-        user_data=data
-    )
+            kcal = float(args["kcal"])
+            if not (0 < kcal <= 10000): errors["kcal"] = "kcal 1-10000"
+        except ValueError:
+            errors["kcal"] = "Invalid kcal"
+    if meal is not None and meal not in MEAL_WEIGHTS:
+        errors["meal"] = f"One of {', '.join(MEAL_WEIGHTS)}"
+    if not query and kcal is None:
+        errors["q"] = "q or kcal required"
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    diet = args.get("diet") or None
+    with span("food_search"):
+        if query:
+            foods = CATALOG.search(query, diet=diet, meal=meal, limit=limit)
+        else:
+            foods = CATALOG.near(kcal, diet=diet, meal=meal, limit=limit)
+    if kcal is not None and foods:
+        items, _ = portion_items(
+            [food["name"] for food in foods],
+            [[food["calories"], food["protein"], food["carbs"], food["fats"]] for food in foods],
+            [kcal] * len(foods),
+            [food["grams"] if food["grams"] is not None else float("nan") for food in foods],
+        )
+        for food, item in zip(foods, items):
+            food["item"] = item
+    return jsonify({"query": query, "results": foods})
+
+
+
+# ---------------------------
+# HEALTH / READINESS
+# ---------------------------
+
+@app.route("/healthz")
+def healthz():
+    report = dict(WARMUP.report(), foods=len(current_food_index()), cache=PLAN_CACHE.stats(), catalog=CATALOG.stats())
+    pool = WARMUP.get("plan_pool") if POOL_PROCESSES else None
+    if pool is not None:
+        report["plan_pool"] = pool.stats()
+    return jsonify(report)
+
+
+@app.route("/readyz")
+def readyz():
+    return jsonify(WARMUP.report()), (200 if WARMUP.ready else 503)
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+import os
+import glob
+import json
+import time
+import shutil
+import numpy as np
+
+# ----------------------------------------------------------------------
+# ATOMICALLY PUBLISHED DIRECTORIES
+# ----------------------------------------------------------------------
+# Build outputs that workers read while they may be rebuilt (food snapshot,
+# compact model, static assets). `path` is a symlink to a versioned sibling
+# (`<path>.v<stamp>`): publish_dir() writes a new version next to it and
+# swaps the link with os.replace(), which is atomic, so a reader opening
+# `path` always finds a complete old or new version, never nothing. The
+# previous version is kept for readers that resolved the link just before
+# the swap; older ones are removed.
+
+
+def _versions(path):
+    return glob.glob(glob.escape(path) + ".v*")
+
+
+def publish_dir(path, write):
+    """Run write(directory) on a fresh version directory, then atomically point `path` at it."""
+    path = os.path.abspath(path)
+    version = f"{path}.v{time.time_ns()}-{os.getpid()}"
+    os.makedirs(version)
+    try:
+        write(version)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+    legacy = None
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A plain directory from before versioned publishing can't be replaced
+        # by a symlink in one step; only this first publish has a gap
+        legacy = f"{path}.old-{os.getpid()}"
+        os.rename(path, legacy)
+    os.replace(link, path)
+
+    if legacy:
+        shutil.rmtree(legacy, ignore_errors=True)
+    for stale in _versions(path):
+        if stale not in (version, previous):
+            shutil.rmtree(stale, ignore_errors=True)
+    return version
+
+
+def load_npy_dir(path, names, version, kind="artifact"):
+    """
+    (meta, {name: array}) for a published directory: meta.json, checked
+    against `version`, and each `<name>.npy` memory-mapped read-only.
+    """
+    while True:
+        # Resolve once: every file comes from the same version even if it's republished meanwhile
+        resolved = os.path.realpath(path)
+        try:
+            return _load_version(resolved, names, version, kind)
+        except FileNotFoundError:
+            # Pruned by two quick republishes: retry on the current version
+            if os.path.realpath(path) == resolved:
+                raise
+
+
+def _load_version(path, names, version, kind):
+    with open(os.path.join(path, "meta.json")) as fh:
+        meta = json.load(fh)
+    if meta.get("version") != version:
+        raise ValueError(f"unsupported {kind} version {meta.get('version')!r}")
+    # Plain ndarray views of the mappings: np.memmap results add overhead to every lookup
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r").view(np.ndarray) for name in names}
+    return meta, arrays
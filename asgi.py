@@ -0,0 +1,256 @@
+import os
+import sys
+import time
+import asyncio
+import mimetypes
+import contextvars
+from io import BytesIO
+from email.utils import formatdate
+from concurrent.futures import ThreadPoolExecutor
+from app import app as flask_app, WARMUP, ASSET_FILES, HASHED_ASSETS, INDEX_HTML, INDEX_ETAG, close_plan_pool
+from build_assets import STATIC_DIR, IMMUTABLE, pick_variant
+from metrics import REQUEST_SECONDS
+
+# ----------------------------------------------------------------------
+# ASGI ENTRY POINT
+# ----------------------------------------------------------------------
+#   uvicorn asgi:app --workers 2
+#   gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+#
+# Same routes as app.py (which stays the sync `gunicorn app:app` entry
+# point). The event loop only does socket I/O and serves the index page and
+# static assets (including build_assets.py's precompressed ones) from
+# memory; every Flask route (planner, model, templates) runs through a
+# small WSGI bridge on a bounded thread pool, so slow requests no longer
+# pin a whole worker and idle/slow clients cost a coroutine, not a thread.
+THREADS = int(os.environ.get("FITFUEL_ASGI_THREADS", (os.cpu_count() or 1) * 2))
+MAX_BODY = int(os.environ.get("FITFUEL_ASGI_MAX_BODY", 8 * 1024 * 1024))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_FILES = {"/style.css": "style.css", "/app.js": "app.js"}  # unhashed fallbacks
+ASSET_PREFIX = "/static/"
+
+EXECUTOR = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="fitfuel-asgi")
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnected()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def send_simple(send, status, body, content_type=b"text/plain; charset=utf-8", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# ---------------------------
+# STATIC FILES (event loop)
+# ---------------------------
+
+_static_cache = {}  # file path -> (mtime, body, headers)
+
+
+def _static_entry(file_path, name, cache_control, encoding=None):
+    """Body + headers for one file on disk (`name` decides the Content-Type)."""
+    mtime = os.stat(file_path).st_mtime
+    cached = _static_cache.get(file_path)
+    if cached is None or cached[0] != mtime:
+        with open(file_path, "rb") as fh:
+            body = fh.read()
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type.endswith("javascript"):
+            content_type += "; charset=utf-8"
+        headers = [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            (b"last-modified", formatdate(mtime, usegmt=True).encode()),
+            (b"cache-control", cache_control.encode()),
+        ]
+        if cache_control == IMMUTABLE:
+            headers.append((b"vary", b"Accept-Encoding"))
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+        cached = _static_cache[file_path] = (mtime, body, headers)
+    return cached
+
+
+INDEX_HEADERS = [
+    (b"content-type", b"text/html; charset=utf-8"),
+    (b"etag", f'"{INDEX_ETAG}"'.encode()),
+    (b"cache-control", b"no-cache"),
+]
+
+
+async def serve_index(scope, send):
+    """The pre-rendered index page from app.py, with If-None-Match support."""
+    if_none_match = next((v for k, v in scope.get("headers", []) if k == b"if-none-match"), b"")
+    if f'"{INDEX_ETAG}"'.encode() in if_none_match:
+        await send({"type": "http.response.start", "status": 304, "headers": INDEX_HEADERS[1:]})
+        await send({"type": "http.response.body", "body": b""})
+        return 304
+    headers = INDEX_HEADERS + [(b"content-length", str(len(INDEX_HTML)).encode())]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else INDEX_HTML})
+    return 200
+
+
+def static_route(path):
+    """Flask route label for a path the event loop serves itself, else None."""
+    if path == "/":
+        return path
+    if path in STATIC_FILES:
+        return path
+    if path.startswith(ASSET_PREFIX) and path[len(ASSET_PREFIX):] in HASHED_ASSETS:
+        return ASSET_PREFIX + "<path:filename>"
+    return None
+
+
+async def serve_static(scope, send):
+    path = scope["path"]
+    if path == "/":
+        return await serve_index(scope, send)
+    if path in STATIC_FILES:
+        entry = _static_entry(os.path.join(ROOT, STATIC_FILES[path]), path, "no-cache")
+    else:
+        filename = path[len(ASSET_PREFIX):]
+        accept = next((v.decode("latin-1") for k, v in scope.get("headers", []) if k == b"accept-encoding"), "")
+        variant, encoding = pick_variant(filename, accept, ASSET_FILES)
+        entry = _static_entry(os.path.join(STATIC_DIR, variant), filename, IMMUTABLE, encoding)
+    _, body, headers = entry
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+    return 200
+
+
+# ---------------------------
+# WSGI BRIDGE (thread pool)
+# ---------------------------
+
+def wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope with an already-read body."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = "HTTP_" + name
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _start_wsgi(environ, response):
+    """Call the Flask app and pull the first body chunk (one pool hop for most responses)."""
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    result = flask_app(environ, start_response)
+    iterator = iter(result)
+    return result, iterator, next(iterator, None)
+
+
+async def call_wsgi(scope, receive, send):
+    try:
+        body = await read_body(receive)
+    except BodyTooLarge:
+        return await send_simple(send, 413, b"Request body too large")
+    except ClientDisconnected:
+        return
+
+    loop = asyncio.get_running_loop()
+    # One Context per request: a streamed response's generator is resumed on
+    # whichever pool thread is free, and Flask's context vars must be reset
+    # in the Context they were set in.
+    context = contextvars.copy_context()
+
+    def run(fn, *args):
+        return loop.run_in_executor(EXECUTOR, context.run, fn, *args)
+
+    response = {}
+    result, iterator, chunk = await run(_start_wsgi, wsgi_environ(scope, body), response)
+    try:
+        await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+        while chunk is not None:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await run(next, iterator, None)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(result, "close"):
+            await run(result.close)
+
+
+# ---------------------------
+# APP
+# ---------------------------
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            WARMUP.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            EXECUTOR.shutdown(wait=False)
+            close_plan_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        raise NotImplementedError(f"unsupported ASGI scope {scope['type']!r}")
+
+    route = static_route(scope["path"]) if scope["method"] in ("GET", "HEAD") else None
+    if route is not None:
+        start = time.perf_counter()
+        status = await serve_static(scope, send)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route=route, status=status)
+        return
+
+    await call_wsgi(scope, receive, send)
@@ -0,0 +1,173 @@
+import numpy as np
+from functools import lru_cache
+from food_index import diet_key
+from metrics import MEAL_PICKS, MODEL_FAILURES, span
+from portions import portion_items
+from utils import (
+    CURATED_DB, MEAL_WEIGHTS, activity_factor, goal_adjustment, calculate_macros,
+    load_food_index, curated_serving, fallback_serving, validate_inputs,
+)
+
+# ----------------------------------------------------------------------
+# BATCH PREDICTION (VECTORIZED /predict FOR MANY PROFILES)
+# ----------------------------------------------------------------------
+MAX_BATCH_SIZE = 10000
+
+
+def _lookup(values, fn, dtype=np.float64):
+    """Apply a scalar string -> number rule once per distinct value."""
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return np.array([fn(u) for u in uniques], dtype=dtype)[inverse]
+
+
+def calculate_tdee_batch(weight, height, age, genders, activities, goals):
+    """Array version of utils.calculate_tdee; returns int64 kcal per profile."""
+    is_male = np.char.startswith(np.char.lower(np.asarray(genders, dtype=str)), "m")
+    bmr = 10 * weight + 6.25 * height - 5 * age + np.where(is_male, 5, -161)
+    tdee = np.trunc(bmr * _lookup(activities, activity_factor)).astype(np.int64)
+    tdee += _lookup(goals, goal_adjustment, dtype=np.int64)
+    return np.maximum(1200, tdee)
+
+
+def calculate_macros_batch(tdee, goals):
+    """
+    Array version of utils.calculate_macros; returns protein, carbs, fat (g)
+    arrays. Evaluated once per distinct (tdee, goal) pair so the rounding is
+    identical to the scalar function.
+    """
+    goal_names, goal_ids = np.unique(np.char.lower(np.asarray(goals, dtype=str)), return_inverse=True)
+    pairs, inverse = np.unique(np.column_stack([tdee, goal_ids]), axis=0, return_inverse=True)
+    table = np.array([
+        list(calculate_macros(int(t), goal=str(goal_names[g])).values()) for t, g in pairs
+    ])
+    return table[inverse.ravel()].T
+
+
+@lru_cache(maxsize=None)
+def _curated_table(diet, meal_name):
+    """(names, per-serving [kcal, p, c, f] rows, serving grams) of one CURATED_DB list as arrays."""
+    options = CURATED_DB.get(diet, {}).get(meal_name, [])
+    servings = [curated_serving(o) for o in options]
+    names = np.array([o["name"] for o in options], dtype=object)
+    values = np.array([values for values, _ in servings], dtype=np.float64).reshape(-1, 4)
+    grams = np.array([grams for _, grams in servings], dtype=np.float64)
+    return names, values, grams
+
+
+def _pick_curated_batch(diet, meal_name, targets, rng):
+    """
+    Vectorized curated pick for one diet/meal: (names, per-serving rows,
+    serving grams) of a random option per target, before portioning.
+    """
+    names, values, grams = _curated_table(diet, meal_name)
+    if not len(names):
+        fallback = np.array([fallback_serving(t) for t in np.asarray(targets, dtype=np.float64)]).reshape(-1, 4)
+        return np.full(len(targets), "Healthy Choice", dtype=object), fallback, np.full(len(targets), np.nan)
+
+    choice = rng.integers(len(names), size=len(targets))
+    return names[choice], values[choice], grams[choice]
+
+
+def get_meal_plans_batch(targets, diets, index=None, rng=None):
+    """
+    Meal plans for many calorie targets against one shared FoodIndex.
+    Same 60/40 curated-vs-dataset rule as get_meal_plan, but every profile on
+    the same diet is resolved with one vectorized lookup per meal, and every
+    meal of every profile is portioned in one portion_items() pass.
+    """
+    index = load_food_index() if index is None else index
+    rng = np.random.default_rng() if rng is None else rng
+    n = len(targets)
+    diet_keys = np.array([diet_key(d) for d in diets])
+
+    # Slot m * n + i is meal m of profile i
+    slots = n * len(MEAL_WEIGHTS)
+    names = np.empty(slots, dtype=object)
+    values = np.zeros((slots, 4), dtype=np.float64)
+    grams = np.full(slots, np.nan)
+    meal_targets = np.zeros(slots, dtype=np.int64)
+
+    for m, (meal_name, weight) in enumerate(MEAL_WEIGHTS.items()):
+        meal_kcal = np.trunc(np.asarray(targets) * weight).astype(np.int64)
+        meal_targets[m * n:(m + 1) * n] = meal_kcal
+        use_dataset = rng.random(n) <= 0.4
+        for diet in np.unique(diet_keys).tolist():
+            in_diet = diet_keys == diet
+            dataset_mask = in_diet & use_dataset if index.size(diet) else np.zeros(n, dtype=bool)
+            from_dataset = np.flatnonzero(dataset_mask)
+            if len(from_dataset):
+                MEAL_PICKS.inc(len(from_dataset), source="dataset")
+                picked = index.sample_nearest(diet, meal_kcal[from_dataset], rng)
+                slot = m * n + from_dataset
+                names[slot] = [index.names[row_id] for row_id in picked.tolist()]
+                values[slot] = np.column_stack([
+                    index.calories[picked], index.protein[picked], index.carbs[picked], index.fats[picked],
+                ])
+
+            from_curated = np.flatnonzero(in_diet & ~dataset_mask)
+            MEAL_PICKS.inc(len(from_curated), source="curated")
+            slot = m * n + from_curated
+            names[slot], values[slot], grams[slot] = _pick_curated_batch(diet, meal_name, meal_kcal[from_curated], rng)
+
+    items, _ = portion_items(names.tolist(), values, meal_targets, grams)
+    plans = [{} for _ in range(n)]
+    for m, meal_name in enumerate(MEAL_WEIGHTS):
+        for i in range(n):
+            plans[i][meal_name] = [items[m * n + i]]
+    return plans
+
+
+def predict_batch(profiles, model=None, index=None, rng=None):
+    """
+    Run the /predict pipeline for a list of profile dicts (same keys as the
+    form). Returns one result dict per profile, in order; invalid profiles get
+    {"errors": {...}} instead of a plan.
+    """
+    results = [None] * len(profiles)
+    valid, rows = [], []
+    for i, profile in enumerate(profiles):
+        data, errors = validate_inputs(profile if isinstance(profile, dict) else {})
+        if errors:
+            results[i] = {"errors": errors}
+        else:
+            valid.append(i)
+            rows.append(data)
+
+    if not rows:
+        return results
+
+    weight = np.array([r["weight"] for r in rows], dtype=np.float64)
+    height = np.array([r["height"] for r in rows], dtype=np.float64)
+    age = np.array([r["age"] for r in rows], dtype=np.float64)
+    genders = [r["gender"] for r in rows]
+    goals = [str(r["goal"]).lower() for r in rows]
+
+    activities = [r["activity"] for r in rows]
+    with span("batch_targets"):
+        tdee = calculate_tdee_batch(weight, height, age, genders, activities, goals)
+        protein, carbs, fat = calculate_macros_batch(tdee, goals)
+    with span("batch_meal_plans"):
+        plans = get_meal_plans_batch(tdee, [r["diet"] for r in rows], index=index, rng=rng)
+
+    predictions = [None] * len(rows)
+    if model:
+        try:
+            with span("batch_model_predict"):
+                predictions = model.predict_profiles(weight, height, age, genders, activities).tolist()
+        except Exception as e:
+            MODEL_FAILURES.inc()
+            print(f"❌ Calorie model prediction failed: {e}")
+
+    for j, i in enumerate(valid):
+        results[i] = {
+            "tdee": int(tdee[j]),
+            "macros": {
+                "protein_g": float(protein[j]),
+                "carbs_g": float(carbs[j]),
+                "fat_g": float(fat[j]),
+            },
+            "plan": plans[j],
+            "prediction": predictions[j],
+            "user_data": rows[j],
+        }
+    return results
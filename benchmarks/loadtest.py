@@ -0,0 +1,369 @@
+"""
+Load test: replays realistic /predict form posts at a target rate and
+reports throughput, latency percentiles, error rates and worker memory over
+time.
+
+    python -m benchmarks.loadtest                                  # uvicorn asgi:app, 20 rps for 30s
+    python -m benchmarks.loadtest --rps 50 --duration 120 --workers 2
+    python -m benchmarks.loadtest --server "gunicorn app:app -w 2 -b 127.0.0.1:{port}"
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --pid 1234   # already running
+    python -m benchmarks.loadtest --out load.json
+
+A server started here loads its foods from FITFUEL_FOOD_DATASET=synthetic:...
+(synthetic_foods.py) with no snapshot or catalog, so it plans over a
+production-sized dataset without the Hugging Face hub.
+
+Open loop: request i is due at start + i / rps whether or not earlier ones
+have finished, and its latency counts from that moment, so a server that
+falls behind shows up as latency rather than as a lower send rate.
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import contextlib
+import http.client
+from urllib.parse import urlencode, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = f"{shlex.quote(sys.executable)} -m uvicorn asgi:app --host 127.0.0.1 --port {{port}} --workers {{workers}} --log-level warning"
+
+# Form choices (index.html) and how often visitors pick them
+ACTIVITIES = (["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Extra Active"],
+              [0.30, 0.30, 0.25, 0.10, 0.05])
+GOALS = (["Maintenance", "Fat Loss", "Muscle Gain"], [0.35, 0.45, 0.20])
+DIETS = (["Veg", "Non-Veg", "Vegan"], [0.50, 0.40, 0.10])
+
+
+# ---------------------------
+# PAYLOADS
+# ---------------------------
+
+def random_profile(rng):
+    """One /predict form: plausible age, height and BMI, weighted select choices."""
+    gender = "Male" if rng.random() < 0.5 else "Female"
+    height = rng.normal(176, 7) if gender == "Male" else rng.normal(163, 6.5)
+    weight = rng.normal(25, 4) * (height / 100) ** 2
+    return {
+        "age": str(int(np.clip(rng.normal(34, 11), 16, 80))),
+        "gender": gender,
+        "height": f"{np.clip(height, 140, 210):.1f}",
+        "weight": f"{np.clip(weight, 40, 180):.1f}",
+        "activity": rng.choice(ACTIVITIES[0], p=ACTIVITIES[1]),
+        "goal": rng.choice(GOALS[0], p=GOALS[1]),
+        "diet": rng.choice(DIETS[0], p=DIETS[1]),
+    }
+
+
+def profile_bodies(count, seed=0):
+    """`count` distinct urlencoded forms; requests draw from these (repeat visitors)."""
+    rng = np.random.default_rng(seed)
+    return [urlencode(random_profile(rng)).encode() for _ in range(count)]
+
+
+# ---------------------------
+# WORKER MEMORY (/proc)
+# ---------------------------
+
+def process_tree(pid):
+    """pid and all its descendants (workers, plan pool children); Linux only."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fh:
+                # ppid is the 2nd field after the parenthesised command name
+                ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, todo = [], [pid]
+    while todo:
+        current = todo.pop()
+        pids.append(current)
+        todo.extend(children.get(current, ()))
+    return pids
+
+
+def rss_mib(pid):
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def memory_sample(pid):
+    """{pid: RSS MiB} for the server process tree, {} when /proc is unavailable."""
+    # RSS counts shared pages (mapped snapshot/model) in every process, so the
+    # total overstates use; per-process growth is the leak signal.
+    if pid is None or not os.path.isdir("/proc"):
+        return {}
+    sample = {p: rss_mib(p) for p in process_tree(pid)}
+    return {p: round(rss, 1) for p, rss in sample.items() if rss is not None}
+
+
+# ---------------------------
+# SERVER
+# ---------------------------
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def start_server(command, dataset, workers, log_path):
+    """
+    Run the app on a free port with the synthetic dataset for the block;
+    yields (process, base url). The server is stopped, its log closed and
+    its scratch directory removed on exit.
+    """
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix="fitfuel-load-") as scratch, open(log_path, "w") as log:
+        env = dict(os.environ,
+                   FITFUEL_FOOD_DATASET=dataset,
+                   # No local snapshot/catalog: they would shadow the dataset
+                   FITFUEL_FOOD_SNAPSHOT=os.path.join(scratch, "no_snapshot"),
+                   FITFUEL_CATALOG_URL="sqlite:///" + os.path.join(scratch, "no_catalog.sqlite"))
+        proc = subprocess.Popen(shlex.split(command.format(port=port, workers=workers)), cwd=ROOT, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        try:
+            yield proc, f"http://127.0.0.1:{port}"
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+def get_json(url, path, timeout=5):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        conn.close()
+
+
+def wait_ready(url, timeout, proc=None):
+    """Poll /readyz (warm-up done) until it answers 200; False on timeout or server exit."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            return False
+        try:
+            if get_json(url, "/readyz")[0] == 200:
+                return True
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+        time.sleep(0.25)
+    return False
+
+
+# ---------------------------
+# LOAD GENERATOR
+# ---------------------------
+
+class Client:
+    """Keep-alive HTTP connection per sender thread."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, path, body):
+        """HTTP status, or the exception name when the request failed."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request("POST", path, body, {"Content-Type": "application/x-www-form-urlencoded"})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            self._local.conn = None
+            return type(e).__name__
+
+
+def is_error(status):
+    return not isinstance(status, int) or status >= 400
+
+
+def latency_stats(latencies):
+    """Percentiles (ms) of an array of latencies in seconds."""
+    if len(latencies) == 0:
+        return {"p50_ms": None, "p90_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99]) * 1000
+    return {"p50_ms": round(p50, 1), "p90_ms": round(p90, 1), "p95_ms": round(p95, 1),
+            "p99_ms": round(p99, 1), "max_ms": round(float(latencies.max()) * 1000, 1)}
+
+
+def run_load(url, bodies, rps, duration, concurrency, interval, pid=None, timeout=30, seed=0):
+    """Send rps * duration /predict posts; (summary, timeline of per-interval stats)."""
+    client = Client(url, timeout)
+    rng = np.random.default_rng(seed)
+    order = rng.integers(len(bodies), size=max(1, int(rps * duration)))
+    done = []  # (finish time, latency s, status); list.append is atomic
+    dispatched = []  # time each request went out (a client thread picked it up)
+    start = time.perf_counter()
+
+    def send(due, body):
+        dispatched.append(time.perf_counter() - start)
+        status = client.post("/predict", body)
+        finished = time.perf_counter()
+        done.append((finished - start, finished - due, status))
+
+    timeline, stop = [], threading.Event()
+    memory_start = memory_sample(pid)
+
+    def report():
+        seen, last = 0, 0.0
+        while True:
+            finished = stop.wait(interval)
+            now = time.perf_counter() - start
+            batch, seen = done[seen:], seen + len(done[seen:])
+            memory = memory_sample(pid)
+            latencies = np.array([latency for _, latency, _ in batch])
+            row = dict(t_s=round(now, 1), completed=len(batch), rps=round(len(batch) / max(now - last, 1e-9), 1),
+                       errors=sum(is_error(status) for _, _, status in batch),
+                       rss_mib=round(sum(memory.values()), 1) if memory else None, **latency_stats(latencies))
+            timeline.append(row)
+            print(f"  {row['t_s']:>7.1f}s {row['rps']:>8.1f} {_cell(row['p50_ms'])} {_cell(row['p99_ms'])}"
+                  f" {row['errors']:>7} {_cell(row['rss_mib'])}", flush=True)
+            last = now
+            if finished:
+                return
+
+    print(f"  {'time':>8} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MiB':>9}")
+    reporter = threading.Thread(target=report, daemon=True)
+    reporter.start()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fitfuel-load") as executor:
+        for i, body_index in enumerate(order):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, due, bodies[body_index])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    reporter.join()
+    memory_end = memory_sample(pid)
+
+    statuses = {}
+    for _, _, status in done:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(is_error(status) for _, _, status in done)
+    # Rate requests actually went out at: below target when concurrency is the limit.
+    # The first is due at 0 and the last at (n - 1) / rps, hence n - 1 intervals.
+    sent_s = max(dispatched, default=0.0)
+    sent_rps = round((len(dispatched) - 1) / sent_s, 1) if sent_s > 0 else None
+    summary = dict(
+        requests=len(done), target_rps=rps, sent_rps=sent_rps,
+        throughput_rps=round(len(done) / elapsed, 1), elapsed_s=round(elapsed, 1),
+        error_rate=round(errors / max(len(done), 1), 4), statuses=statuses,
+        **latency_stats(np.array([latency for _, latency, _ in done])),
+        memory=memory_growth(memory_start, memory_end),
+    )
+    return summary, timeline
+
+
+def memory_growth(before, after):
+    """Per-process RSS (MiB) at start/end of the run and the difference."""
+    return {str(pid): {"start_mib": before.get(pid), "end_mib": rss,
+                       "growth_mib": round(rss - before[pid], 1) if pid in before else None}
+            for pid, rss in sorted(after.items())}
+
+
+def _cell(value):
+    return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FitFuel /predict load test")
+    parser.add_argument("--url", help="test this running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="server pid to sample memory from (with --url)")
+    parser.add_argument("--server", default=SERVER, help="server command ({port} and {workers} are filled in)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--dataset", default="synthetic:50000",
+                        help="FITFUEL_FOOD_DATASET for the started server (synthetic:ROWS[:VARIANT[:SEED]])")
+    parser.add_argument("--rps", type=float, default=20.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=32, help="max requests in flight")
+    parser.add_argument("--profiles", type=int, default=500, help="distinct form payloads to replay")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between progress lines")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout")
+    parser.add_argument("--ready-timeout", type=float, default=180.0, help="seconds to wait for warm-up")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        proc, url, pid = None, args.url, args.pid
+        if url is None:
+            log_path = os.path.join(tempfile.gettempdir(), "fitfuel-loadtest-server.log")
+            proc, url = stack.enter_context(start_server(args.server, args.dataset, args.workers, log_path))
+            pid = proc.pid
+            print(f"🚀 Server starting at {url} ({args.dataset}, log: {log_path})")
+        if not wait_ready(url, args.ready_timeout, proc):
+            sys.exit(f"❌ Server at {url} did not become ready within {args.ready_timeout:g}s.")
+        _, health = get_json(url, "/healthz")
+        foods = health.get("foods") if isinstance(health, dict) else None
+        if foods == 0:
+            print("⚠️  Server has no dataset foods: plans come from curated foods only, unlike production.")
+        print(f"✅ Ready ({foods if foods is not None else '?'} foods). "
+              f"Sending {args.rps:g} rps for {args.duration:g}s, concurrency {args.concurrency}")
+
+        bodies = profile_bodies(args.profiles, args.seed)
+        summary, timeline = run_load(url, bodies, args.rps, args.duration, args.concurrency,
+                                     args.interval, pid, args.timeout, args.seed)
+
+    print(f"\n📊 {summary['requests']} requests in {summary['elapsed_s']}s: "
+          f"{summary['throughput_rps']} rps (target {args.rps:g}, sent at {summary['sent_rps']} rps)")
+    print(f"   latency ms  p50 {summary['p50_ms']}  p90 {summary['p90_ms']}  p95 {summary['p95_ms']}"
+          f"  p99 {summary['p99_ms']}  max {summary['max_ms']}")
+    icon = "❌" if summary["error_rate"] > 0 else "✅"
+    print(f"{icon} error rate {summary['error_rate']:.2%}  statuses {summary['statuses']}")
+    for process, memory in summary["memory"].items():
+        growth = memory["growth_mib"]
+        print(f"   pid {process}: RSS {memory['end_mib']} MiB"
+              + (f" ({growth:+.1f} MiB during the run)" if growth is not None else " (started during the run)"))
+
+    if args.out:
+        meta = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "url": args.url, "server": None if args.url else args.server.format(port="PORT", workers=args.workers),
+            "dataset": None if args.url else args.dataset,
+            "foods": foods, "rps": args.rps, "duration_s": args.duration, "concurrency": args.concurrency,
+            "profiles": args.profiles, "python": platform.python_version(), "machine": platform.machine(),
+        }
+        with open(args.out, "w") as fh:
+            json.dump({"meta": meta, "summary": summary, "timeline": timeline}, fh, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Offline benchmark suite for the request pipeline and meal-planner hot paths.
+
+    python -m benchmarks.run                          # default sizes, print table
+    python -m benchmarks.run --out bench.json         # also write results
+    python -m benchmarks.run --compare bench.json     # flag regressions vs a previous run
+
+The food dataset is synthetic (synthetic_foods.py) and is written as a
+food snapshot, so nothing touches the network.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILE = {
+    "age": "29", "gender": "Female", "height": "165", "weight": "62",
+    "activity": "Moderately Active", "goal": "Fat Loss", "diet": "Veg",
+}
+
+
+class _DatasetOnly(random.Random):
+    """RNG that always takes the dataset branch of pick_foods_for_calories."""
+
+    def random(self):
+        return 0.0
+
+
+def measure(fn, iterations, warmup=None):
+    """Latency percentiles (us), throughput and peak traced memory for fn()."""
+    for _ in range(warmup if warmup is not None else max(1, iterations // 10)):
+        fn()
+
+    gc.collect()
+    samples = np.empty(iterations)
+    clock = time.perf_counter
+    start_all = clock()
+    for i in range(iterations):
+        start = clock()
+        fn()
+        samples[i] = clock() - start
+    elapsed = clock() - start_all
+
+    # Memory in a separate, shorter pass: tracemalloc distorts timings
+    tracemalloc.start()
+    for _ in range(max(1, iterations // 20)):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples *= 1e6
+    return {
+        "iterations": iterations,
+        "mean_us": round(float(samples.mean()), 2),
+        "p50_us": round(float(np.percentile(samples, 50)), 2),
+        "p90_us": round(float(np.percentile(samples, 90)), 2),
+        "p99_us": round(float(np.percentile(samples, 99)), 2),
+        "ops_per_sec": round(iterations / elapsed, 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def build_index(rows, seed=0):
+    from utils import normalize_food_dataframe
+    from food_index import FoodIndex
+    from synthetic_foods import synthetic_food_frame
+
+    return FoodIndex.from_dataframe(normalize_food_dataframe(synthetic_food_frame(rows, seed)))
+
+
+def run(sizes, iterations):
+    with tempfile.TemporaryDirectory(prefix="fitfuel-bench-") as snapshot_dir:
+        return _run(sizes, iterations, os.path.join(snapshot_dir, "food_snapshot"))
+
+
+def _run(sizes, iterations, snapshot):
+    # Point the app at a synthetic snapshot before anything loads utils
+    os.environ["FITFUEL_FOOD_SNAPSHOT"] = snapshot
+    os.chdir(ROOT)
+
+    from food_snapshot import write_snapshot
+    write_snapshot(build_index(max(sizes)), snapshot, source="synthetic")
+
+    import utils
+    from calorie_model import CalorieModel
+
+    results = {}
+
+    def bench(name, fn, n=iterations, **extra):
+        print(f"  {name} ...", flush=True)
+        results[name] = dict(measure(fn, n), **extra)
+
+    form = dict(PROFILE)
+    data, _ = utils.validate_inputs(form)
+    goal = data["goal"].lower()
+    tdee = utils.calculate_tdee(data["weight"], data["height"], data["age"], data["gender"], data["activity"], goal)
+    macros = utils.calculate_macros(tdee, goal)
+
+    bench("validate_inputs", lambda: utils.validate_inputs(form))
+    bench("calculate_tdee", lambda: utils.calculate_tdee(
+        data["weight"], data["height"], data["age"], data["gender"], data["activity"], goal))
+    bench("calculate_macros", lambda: utils.calculate_macros(tdee, goal))
+    bench("pick_from_curated", lambda: utils.pick_from_curated("Veg", "Lunch", 600))
+
+    dataset_rng = _DatasetOnly(0)
+    for rows in sizes:
+        start = time.perf_counter()
+        index = build_index(rows)
+        build_s = time.perf_counter() - start
+        bench(f"pick_foods_for_calories[{rows}]",
+              lambda: utils.pick_foods_for_calories(index, 600, "veg", "Lunch", dataset_rng),
+              rows=rows, index_build_s=round(build_s, 3))
+        bench(f"get_meal_plan[{rows}]", lambda: utils.get_meal_plan(tdee, "Veg", index=index),
+              n=max(1, iterations // 5), rows=rows)
+        del index
+
+    from meal_optimizer import optimize_meal_plan
+    index = utils.load_food_index()
+    bench("optimize_meal_plan", lambda: optimize_meal_plan(tdee, macros, "Veg", index=index),
+          n=max(1, iterations // 20))
+
+    model = utils.safe_load_model("calorie_model.pkl")
+    if model is not None:
+        args = (data["weight"], data["height"], data["age"], data["gender"], data["activity"])
+        bench("model.predict_profiles[flat]", lambda: model.predict_profiles(*args))
+        sklearn_model = CalorieModel(model.estimator, model.features, model.gender_mapping, backend="sklearn")
+        bench("model.predict_profiles[sklearn]", lambda: sklearn_model.predict_profiles(*args),
+              n=max(1, iterations // 20))
+
+    import app as app_module
+    while not app_module.WARMUP.ready:
+        time.sleep(0.05)
+    client = app_module.app.test_client()
+    bench("POST /predict", lambda: client.post("/predict", data=form), n=max(1, iterations // 5))
+    bench("GET /", lambda: client.get("/"), n=max(1, iterations // 5))
+
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """Print cases whose p50 got slower than `threshold` (fraction) vs baseline."""
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)["results"]
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before and before["p50_us"] > 0:
+            change = current["p50_us"] / before["p50_us"] - 1
+            if change > threshold:
+                regressions.append((name, before["p50_us"], current["p50_us"], change))
+    for name, before, now, change in regressions:
+        print(f"❌ REGRESSION {name}: p50 {before:.1f}us -> {now:.1f}us (+{change:.0%})")
+    if not regressions:
+        print(f"✅ No p50 regressions over {threshold:.0%} vs {baseline_path}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FitFuel offline benchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000",
+                        help="comma-separated synthetic dataset sizes")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="p50 slowdown fraction counted as a regression")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    print(f"🚀 Running benchmarks (sizes={sizes}, iterations={args.iterations})")
+    results = run(sizes, args.iterations)
+
+    print(f"\n{'case':<40}{'p50 us':>10}{'p99 us':>10}{'ops/s':>12}{'peak KiB':>10}")
+    for name, r in results.items():
+        print(f"{name:<40}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['ops_per_sec']:>12.1f}{r['peak_kib']:>10.1f}")
+
+    if args.out:
+        try:
+            commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip()
+        except OSError:
+            commit = ""
+        meta = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "sizes": sizes,
+        }
+        with open(args.out, "w") as fh:
+            json.dump({"meta": meta, "results": results}, fh, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
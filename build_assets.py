@@ -0,0 +1,116 @@
+import os
+import gzip
+import json
+import hashlib
+import argparse
+from artifact_dir import publish_dir
+
+try:
+    import brotli  # optional: .br variants are skipped without it
+except ImportError:
+    brotli = None
+
+# ----------------------------------------------------------------------
+# STATIC ASSET BUILD
+# ----------------------------------------------------------------------
+# `python build_assets.py` copies each asset into static/ under a content
+# hashed name (style.<hash>.css) with .gz/.br siblings and writes
+# static/manifest.json. Hashed names never change content, so they are
+# served with a one-year immutable Cache-Control and the best variant the
+# client accepts. Templates link them through asset_url(); without a build
+# (local dev) asset_url() falls back to the plain /style.css, /app.js routes.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+ASSETS = ("style.css", "app.js")
+MANIFEST = "manifest.json"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def hashed_name(name, content):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def build_assets(out_dir=STATIC_DIR, assets=ASSETS):
+    """Write hashed + precompressed assets and the manifest; returns the manifest."""
+    manifest = {}
+
+    def write(directory):
+        for name in assets:
+            with open(os.path.join(ROOT, name), "rb") as fh:
+                content = fh.read()
+            target = hashed_name(name, content)
+            manifest[name] = target
+            with open(os.path.join(directory, target), "wb") as fh:
+                fh.write(content)
+            # mtime=0 keeps the .gz bytes reproducible across builds
+            with open(os.path.join(directory, target + ".gz"), "wb") as fh:
+                fh.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(os.path.join(directory, target + ".br"), "wb") as fh:
+                    fh.write(brotli.compress(content, quality=11))
+            print(f"📦 {name} -> {target} ({len(content)} bytes)")
+
+        if brotli is None:
+            print("⚠️  brotli not installed; only gzip variants written.")
+        # Manifest last: a directory with a manifest has every file it names
+        tmp_manifest = os.path.join(directory, MANIFEST + ".tmp")
+        with open(tmp_manifest, "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(tmp_manifest, os.path.join(directory, MANIFEST))
+
+    # Swapped in whole (artifact_dir.py): static/ never lacks a manifest or its files
+    publish_dir(out_dir, write)
+    return manifest
+
+
+def built_files(static_dir=STATIC_DIR):
+    try:
+        return frozenset(os.listdir(static_dir))
+    except OSError:
+        return frozenset()
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """{source name: hashed name}; empty when the assets were never built."""
+    try:
+        with open(os.path.join(static_dir, MANIFEST)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows (q=0 excluded)."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def pick_variant(filename, accept_encoding, available):
+    """(file to send, Content-Encoding or None) for a hashed asset; `available` is the set of built files."""
+    accepted = accepted_encodings(accept_encoding)
+    for coding, suffix in ENCODINGS:
+        if (coding in accepted or "*" in accepted) and filename + suffix in available:
+            return filename + suffix, coding
+    return filename, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets.")
+    parser.add_argument("--out", default=STATIC_DIR)
+    manifest = build_assets(parser.parse_args().out)
+    print(f"💾 {len(manifest)} assets written.")
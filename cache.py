@@ -0,0 +1,140 @@
+import os
+import abc
+import time
+import threading
+from collections import OrderedDict
+
+# ----------------------------------------------------------------------
+# RESPONSE CACHE
+# ----------------------------------------------------------------------
+# Bounded LRU + TTL cache for deterministic plan results. MemoryCache is the
+# in-process default (and the local stand-in for tests/benchmarks);
+# RedisCache shares entries between workers/boxes. make_cache() picks one
+# from FITFUEL_CACHE_URL. Values are bytes (a plan as JSON, rendered per
+# request): nothing read back from a shared cache is ever unpickled.
+CACHE_URL = os.environ.get("FITFUEL_CACHE_URL", "memory://")
+CACHE_SIZE = int(os.environ.get("FITFUEL_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("FITFUEL_CACHE_TTL", "3600"))
+# Seconds a Redis call may take before it counts as a miss/skipped write
+CACHE_TIMEOUT = float(os.environ.get("FITFUEL_CACHE_TIMEOUT", "0.1"))
+
+
+class CacheBackend(abc.ABC):
+    """get/set interface plus hit/miss/eviction/error counters."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Cached bytes for key, or None."""
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        """Store bytes under key for the backend's TTL."""
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(size=len(self._data), maxsize=self.maxsize, ttl=self.ttl)
+        return stats
+
+
+class RedisCache(CacheBackend):
+    """
+    Shared cache; LRU eviction is left to Redis' maxmemory-policy. Redis
+    being down or slow never fails a request: a failed get is a miss and a
+    failed set is skipped (both counted as errors).
+    """
+
+    def __init__(self, url, ttl=CACHE_TTL, timeout=CACHE_TIMEOUT):
+        super().__init__()
+        import redis  # optional dependency, only needed for redis:// URLs
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.error_types = (redis.RedisError,)
+        self.ttl = ttl
+
+    def _failed(self, action, e):
+        self.errors += 1
+        if self.errors == 1:
+            print(f"⚠️  Redis cache {action} failed ({e}); serving without it while it fails.")
+
+    def get(self, key):
+        try:
+            raw = self.client.get(key)
+        except self.error_types as e:
+            self._failed("get", e)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return raw
+
+    def set(self, key, value):
+        try:
+            # px: sub-second TTLs would round down to an invalid ex=0
+            self.client.set(key, bytes(value), px=max(1, int(self.ttl * 1000)))
+        except self.error_types as e:
+            self._failed("set", e)
+
+    def stats(self):
+        stats = super().stats()
+        try:
+            stats["evictions"] = self.client.info("stats").get("evicted_keys", 0)
+        except self.error_types:
+            pass
+        return stats
+
+
+def make_cache(url=CACHE_URL):
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        try:
+            return RedisCache(url)
+        except Exception as e:
+            print(f"⚠️  Redis cache unavailable ({e}); using in-process cache.")
+    return MemoryCache()
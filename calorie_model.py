@@ -0,0 +1,277 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from artifact_dir import publish_dir, load_npy_dir
+
+# ----------------------------------------------------------------------
+# CALORIE MODEL: FEATURE SCHEMA + FAST INFERENCE
+# ----------------------------------------------------------------------
+# train_model.py fits on calories.csv (calories burned in one exercise
+# session) and saves the estimator together with this feature list, so the
+# app always builds its inputs in the order the model was trained on.
+FEATURES = ["Gender", "Age", "Height", "Weight", "Duration", "Heart_Rate"]
+
+# Where train_model.py writes the artifact and the app loads it from
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calorie_model.pkl")
+
+# LabelEncoder order used by train_model.py (alphabetical)
+GENDER_MAPPING = {"female": 0, "male": 1}
+
+# Typical daily session (minutes, avg heart rate) per activity level,
+# within the Duration 1-30 / Heart_Rate 67-128 range seen in training.
+ACTIVITY_SESSIONS = {
+    "sedentary": (10, 85),
+    "light":     (15, 92),
+    "moderate":  (20, 98),
+    "very":      (25, 105),
+    "extra":     (30, 112),
+}
+
+# "auto" uses the flattened forest when the estimator supports it
+MODEL_BACKEND = os.environ.get("FITFUEL_MODEL_BACKEND", "auto")
+
+# Estimators whose trees average into the prediction (FlatForest can replace them)
+FLATTENABLE = ("RandomForestRegressor", "ExtraTreesRegressor", "DecisionTreeRegressor")
+
+
+def session_for_activity(activity):
+    """(Duration, Heart_Rate) for an activity level, same matching as utils.activity_factor."""
+    activity = str(activity).lower()
+    for key, session in ACTIVITY_SESSIONS.items():
+        if key in activity:
+            return session
+    return ACTIVITY_SESSIONS["sedentary"]
+
+
+def _node_depths(left, right):
+    """Depth of every node of one sklearn tree (root = 0), one level at a time."""
+    depth = np.zeros(len(left), dtype=np.int64)
+    frontier = np.array([0])
+    level = 0
+    while frontier.size:
+        depth[frontier] = level
+        internal = frontier[left[frontier] != -1]
+        frontier = np.concatenate([left[internal], right[internal]])
+        level += 1
+    return depth
+
+
+class FlatForest:
+    """
+    Tree ensemble flattened into contiguous node arrays. All trees (and all
+    rows) are walked together with NumPy take(), one level per step, which
+    avoids sklearn's per-call validation and thread dispatch on tiny inputs.
+    children[2 * node] is the left child, children[2 * node + 1] the right;
+    leaves point to themselves, so steps past a leaf are no-ops.
+    value may be quantized ints; predictions are mean(value) * scale + offset.
+    """
+    __slots__ = ("feature", "threshold", "children", "value", "roots", "depth", "scale", "offset")
+
+    def __init__(self, feature, threshold, children, value, roots, depth, scale=1.0, offset=0.0):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.scale = scale
+        self.offset = offset
+
+    @classmethod
+    def from_estimator(cls, estimator, max_depth=None):
+        """Flatten a fitted tree/forest; max_depth turns deeper subtrees into leaves (their mean)."""
+        trees = [e.tree_ for e in getattr(estimator, "estimators_", [estimator])]
+        feature, threshold, children, value, roots = [], [], [], [], []
+        offset = 0
+        depth = 0
+        for tree in trees:
+            left, right = tree.children_left, tree.children_right
+            node_depth = _node_depths(left, right)
+            cap = node_depth.max() if max_depth is None else min(max_depth, node_depth.max())
+            kept = np.flatnonzero(node_depth <= cap)
+            new_id = np.cumsum(node_depth <= cap) - 1
+            leaf = (left[kept] == -1) | (node_depth[kept] == cap)
+            local = np.arange(len(kept))
+
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature[kept]))
+            threshold.append(np.where(leaf, np.inf, tree.threshold[kept]))
+            left_id = np.where(leaf, local, new_id[left[kept]]) + offset
+            right_id = np.where(leaf, local, new_id[right[kept]]) + offset
+            children.append(np.column_stack([left_id, right_id]).ravel())
+            value.append(tree.value[kept, 0, 0])
+            offset += len(kept)
+            depth = max(depth, int(cap))
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(value).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            depth=depth,
+        )
+
+    def compact(self, value_bits=16):
+        """
+        Smaller copy: uint8 features, float32 thresholds (rounded down, which
+        keeps every split identical for float32 inputs) and leaf values
+        quantized to value_bits (0 keeps float32 values).
+        """
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        values = self.value * self.scale + self.offset
+        if value_bits:
+            low, high = float(values.min()), float(values.max())
+            scale = (high - low) / (2 ** value_bits - 1) or 1.0
+            dtype = np.uint8 if value_bits <= 8 else np.uint16
+            quantized = np.rint((values - low) / scale).astype(dtype)
+            return FlatForest(self.feature.astype(np.uint8), threshold, self.children, quantized,
+                              self.roots, self.depth, scale, low)
+        return FlatForest(self.feature.astype(np.uint8), threshold, self.children,
+                          values.astype(np.float32), self.roots, self.depth)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ("feature", "threshold", "children", "value", "roots"))
+
+    def predict(self, X):
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n, width = X.shape
+        if n == 1:
+            return self._predict_one(X[0])
+        flat_x = X.ravel()
+        row_base = (np.arange(n) * width)[:, None]
+        node = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.depth):
+            go_right = flat_x.take(row_base + self.feature.take(node)) > self.threshold.take(node)
+            node = self.children.take(2 * node + go_right)
+        return self.value.take(node).mean(axis=1) * self.scale + self.offset
+
+    def _predict_one(self, x):
+        # Same walk without the row dimension: the common single-profile case
+        node = self.roots
+        for _ in range(self.depth):
+            node = self.children.take(2 * node + (x.take(self.feature.take(node)) > self.threshold.take(node)))
+        return self.value.take(node).mean(keepdims=True) * self.scale + self.offset
+
+
+class CalorieModel:
+    """Estimator plus the feature schema it was trained with."""
+
+    def __init__(self, estimator, features=FEATURES, gender_mapping=GENDER_MAPPING, backend=MODEL_BACKEND,
+                 fast=None):
+        self.estimator = estimator  # None for a compact (FlatForest-only) artifact
+        self.features = list(features)
+        self.gender_mapping = dict(gender_mapping)
+        self.fast = fast
+        if fast is None and backend != "sklearn" and type(estimator).__name__ in FLATTENABLE:
+            try:
+                self.fast = FlatForest.from_estimator(estimator)
+            except Exception as e:
+                print(f"⚠️  Fast model backend unavailable, using sklearn: {e}")
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        """Wrap what joblib.load returned: a {"model", "features", ...} bundle or a bare estimator."""
+        if isinstance(artifact, dict):
+            return cls(
+                artifact["model"],
+                features=artifact.get("features", FEATURES),
+                gender_mapping=artifact.get("gender_mapping", GENDER_MAPPING),
+            )
+        features = getattr(artifact, "feature_names_in_", None)
+        return cls(artifact, features=FEATURES if features is None else list(features))
+
+    def build_features(self, weight, height, age, gender, activity):
+        """Feature matrix in schema order; accepts scalars or equal-length arrays."""
+        male = self.gender_mapping.get("male", 1)
+        female = self.gender_mapping.get("female", 0)
+
+        if all(np.ndim(v) == 0 for v in (weight, height, age, gender, activity)):
+            # Single profile (every /predict request): skip the array machinery
+            duration, heart_rate = session_for_activity(activity)
+            columns = {
+                "Gender": male if str(gender).lower().startswith("m") else female,
+                "Age": age,
+                "Height": height,
+                "Weight": weight,
+                "Duration": duration,
+                "Heart_Rate": heart_rate,
+            }
+            return np.array([[columns[f] for f in self.features]], dtype=np.float64)
+
+        genders = np.char.lower(np.atleast_1d(np.asarray(gender, dtype=str)))
+        activities = np.atleast_1d(np.asarray(activity, dtype=str))
+        uniques, inverse = np.unique(activities, return_inverse=True)
+        sessions = np.array([session_for_activity(a) for a in uniques], dtype=np.float64)[inverse]
+
+        columns = {
+            "Gender": np.where(np.char.startswith(genders, "m"), male, female),
+            "Age": age,
+            "Height": height,
+            "Weight": weight,
+            "Duration": sessions[:, 0],
+            "Heart_Rate": sessions[:, 1],
+        }
+        n = max(len(np.atleast_1d(v)) for v in (weight, height, age, genders, activities))
+        return np.column_stack([np.broadcast_to(np.asarray(columns[f], dtype=np.float64), n) for f in self.features])
+
+    def predict(self, X):
+        if self.fast is not None:
+            return self.fast.predict(X)
+        if hasattr(self.estimator, "feature_names_in_"):
+            X = pd.DataFrame(X, columns=self.features)
+        return self.estimator.predict(X)
+
+    def predict_profiles(self, weight, height, age, gender, activity):
+        """Estimated kcal burned in a typical session for each profile."""
+        return self.predict(self.build_features(weight, height, age, gender, activity))
+
+
+# ----------------------------------------------------------------------
+# COMPACT ARTIFACT
+# ----------------------------------------------------------------------
+# `python train_model.py --export` writes a FlatForest as plain .npy files
+# plus meta.json (schema, value scale/offset, accuracy vs the full model).
+# Workers np.load() them with mmap_mode="r": nothing is unpickled and all
+# workers on a box share the same page-cache pages.
+# Re-exports are published with an atomic symlink swap (artifact_dir.py).
+FLAT_MODEL_PATH = os.path.join(os.path.dirname(MODEL_PATH), "calorie_model.flat")
+FLAT_FORMAT_VERSION = 1
+FLAT_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+
+def artifact_digest(path):
+    """blake2b of a pickled artifact; ties a compact export to the model it came from."""
+    with open(path, "rb") as fh:
+        return hashlib.blake2b(fh.read(), digest_size=16).hexdigest()
+
+
+def write_flat_model(flat, path, features=FEATURES, gender_mapping=GENDER_MAPPING, **meta):
+    """Write a FlatForest to directory `path`, replacing any existing one atomically (see artifact_dir.py)."""
+    def write(directory):
+        for name in FLAT_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(flat, name))
+        with open(os.path.join(directory, "meta.json"), "w") as fh:
+            json.dump(dict(meta, version=FLAT_FORMAT_VERSION, features=list(features),
+                           gender_mapping=dict(gender_mapping), depth=int(flat.depth),
+                           scale=float(flat.scale), offset=float(flat.offset)), fh, indent=2)
+
+    publish_dir(path, write)
+
+
+def read_flat_meta(path):
+    meta, _ = load_npy_dir(path, (), FLAT_FORMAT_VERSION, kind="compact model")
+    return meta
+
+
+def load_flat_model(path):
+    """Memory-map a compact artifact as a CalorieModel with no sklearn estimator."""
+    meta, arrays = load_npy_dir(path, FLAT_ARRAYS, FLAT_FORMAT_VERSION, kind="compact model")
+    flat = FlatForest(depth=meta["depth"], scale=meta["scale"], offset=meta["offset"], **arrays)
+    return CalorieModel(None, meta["features"], meta["gender_mapping"], fast=flat)
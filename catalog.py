@@ -0,0 +1,356 @@
+import os
+import re
+import abc
+import time
+import sqlite3
+import argparse
+import threading
+import pandas as pd
+from urllib.request import pathname2url
+from diet_tags import VEG, VEGAN, diet_flags
+from food_index import DIET_REQUIRE, diet_key
+
+# ----------------------------------------------------------------------
+# FOOD CATALOG
+# ----------------------------------------------------------------------
+#   python catalog.py                       # CURATED_DB + dataset -> data/food_catalog.sqlite
+#   python catalog.py --csv extra_foods.csv # ... plus foods of our own
+#
+# One searchable store for every food: curated entries, the Hugging Face
+# dataset and any extra CSV (same columns the dataset loader understands).
+# SQLiteCatalog answers /foods/search from a local file:
+#   - FTS5 prefix search on names (LIKE on word starts if SQLite lacks FTS5)
+#   - calorie indexes, one partial index per diet bit, for "foods near N kcal"
+#   - one read-only connection per worker thread
+# The import builds a new file and renames it over the old one; workers
+# reopen on their next query, so updating foods needs no redeploy. The
+# planner's FoodIndex is built from the catalog too when there is no
+# snapshot (see utils.load_food_index). MemoryCatalog (curated foods only)
+# is the fallback when no catalog file exists. make_catalog() picks one
+# from FITFUEL_CATALOG_URL.
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "food_catalog.sqlite")
+CATALOG_URL = os.environ.get("FITFUEL_CATALOG_URL", "sqlite:///" + CATALOG_PATH)
+CATALOG_VERSION = 1
+
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+FIELDS = ("id", "name", "source", "meal", "calories", "protein", "carbs", "fats", "grams")
+SELECT = ", ".join(f"f.{field}" for field in FIELDS)
+
+TOKEN = re.compile(r"[^\W_]+")
+MAX_TOKENS = 8
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE foods (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    search_name TEXT NOT NULL,   -- ' word word ...', for the LIKE fallback
+    source TEXT NOT NULL,        -- curated / dataset / custom
+    meal TEXT,                   -- curated meal slot; NULL = any meal
+    calories REAL NOT NULL,      -- per serving
+    protein REAL NOT NULL,
+    carbs REAL NOT NULL,
+    fats REAL NOT NULL,
+    grams REAL,                  -- serving weight; NULL when unknown
+    diet_flags INTEGER NOT NULL  -- diet_tags bits
+);
+"""
+# Contentless: rows are read from foods. The diet column holds the DIET_REQUIRE
+# keys a food qualifies for, so FTS intersects name and diet in one lookup.
+FTS_SCHEMA = ("CREATE VIRTUAL TABLE foods_fts USING fts5(name, diet, content='', "
+              "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4')")
+
+
+def search_tokens(query):
+    return TOKEN.findall(str(query).lower())[:MAX_TOKENS]
+
+
+def diet_terms(flags):
+    return " ".join(key for key, bits in DIET_REQUIRE.items() if bits and flags & bits == bits)
+
+
+def _food(row):
+    return dict(zip(FIELDS, row))
+
+
+def _filters(diet, meal):
+    """Extra WHERE terms + params. Diet bits are inlined so the partial indexes match."""
+    clauses, params = [], []
+    require = DIET_REQUIRE[diet_key(diet)] if diet else 0
+    if require:
+        clauses.append(f"f.diet_flags & {require}")
+    if meal:
+        clauses.append("(f.meal IS NULL OR f.meal = ?)")
+        params.append(meal)
+    return "".join(" AND " + clause for clause in clauses), params
+
+
+class CatalogBackend(abc.ABC):
+    """search()/near() over catalog foods; each food is a dict with FIELDS keys."""
+
+    @abc.abstractmethod
+    def search(self, query, diet=None, meal=None, limit=SEARCH_LIMIT):
+        """Foods whose name has a word starting with every query word, in import order."""
+
+    @abc.abstractmethod
+    def near(self, kcal, diet=None, meal=None, limit=SEARCH_LIMIT):
+        """Foods closest to kcal per serving."""
+
+    def stats(self):
+        return {"backend": type(self).__name__}
+
+
+class SQLiteCatalog(CatalogBackend):
+    def __init__(self, path):
+        self.path = path
+        self.connections = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        conn, _ = self._open()  # fail fast on a missing/unreadable file
+        conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(f"file:{pathname2url(self.path)}?mode=ro", uri=True)
+        conn.execute("PRAGMA query_only = 1")
+        conn.execute("PRAGMA mmap_size = 268435456")
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if int(meta.get("version", 0)) != CATALOG_VERSION:
+            conn.close()
+            raise ValueError(f"unsupported catalog version {meta.get('version')!r}")
+        return conn, meta.get("fts") == "1"
+
+    def _connection(self):
+        """
+        This thread's read-only connection. Reopened once an import has
+        replaced the file, and never reused across a fork.
+        """
+        key = (os.getpid(), os.stat(self.path).st_ino)
+        local = self._local
+        if getattr(local, "key", None) != key:
+            if getattr(local, "key", (None,))[0] == key[0]:
+                local.conn.close()
+            local.conn, local.fts = self._open()
+            local.key = key
+            with self._lock:
+                self.connections += 1
+        return local.conn, local.fts
+
+    def search(self, query, diet=None, meal=None, limit=SEARCH_LIMIT):
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        conn, fts = self._connection()
+        if fts:
+            where, params = _filters(None, meal)
+            match = " AND ".join(f'name : "{token}"*' for token in tokens)
+            if diet and DIET_REQUIRE[diet_key(diet)]:
+                match += f" AND diet : {diet_key(diet)}"
+            sql = (f"SELECT {SELECT} FROM foods_fts JOIN foods f ON f.id = foods_fts.rowid "
+                   f"WHERE foods_fts MATCH ?{where} "
+                   f"ORDER BY foods_fts.rowid LIMIT ?")
+            params = [match, *params, limit]
+        else:
+            where, params = _filters(diet, meal)
+            words = " AND ".join("f.search_name LIKE ?" for _ in tokens)
+            sql = (f"SELECT {SELECT} FROM foods f WHERE {words}{where} "
+                   f"ORDER BY f.id LIMIT ?")
+            params = [f"% {token}%" for token in tokens] + params + [limit]
+        return [_food(row) for row in conn.execute(sql, params)]
+
+    def near(self, kcal, diet=None, meal=None, limit=SEARCH_LIMIT):
+        conn, _ = self._connection()
+        where, params = _filters(diet, meal)
+        # Two index range scans (first foods above, first below), merged by distance
+        above = conn.execute(f"SELECT {SELECT} FROM foods f WHERE f.calories >= ?{where} "
+                             f"ORDER BY f.calories LIMIT ?", [kcal, *params, limit]).fetchall()
+        below = conn.execute(f"SELECT {SELECT} FROM foods f WHERE f.calories < ?{where} "
+                             f"ORDER BY f.calories DESC LIMIT ?", [kcal, *params, limit]).fetchall()
+        rows = sorted(above + below, key=lambda row: abs(row[4] - kcal))[:limit]
+        return [_food(row) for row in rows]
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(path=self.path, connections=self.connections)
+        return stats
+
+
+class MemoryCatalog(CatalogBackend):
+    """Linear scan over a list of food dicts; the local stand-in when there is no catalog file."""
+
+    def __init__(self, foods):
+        self.foods = list(foods)
+        self._search_names = [" " + " ".join(search_tokens(food["name"])) for food in self.foods]
+
+    def _matches(self, i, diet, meal):
+        require = DIET_REQUIRE[diet_key(diet)] if diet else 0
+        food = self.foods[i]
+        return (food["diet_flags"] & require) == require and (not meal or food["meal"] in (None, meal))
+
+    def _public(self, food):
+        return {field: food[field] for field in FIELDS}
+
+    def search(self, query, diet=None, meal=None, limit=SEARCH_LIMIT):
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        hits = [i for i, name in enumerate(self._search_names)
+                if all(" " + token in name for token in tokens) and self._matches(i, diet, meal)]
+        return [self._public(self.foods[i]) for i in hits[:limit]]
+
+    def near(self, kcal, diet=None, meal=None, limit=SEARCH_LIMIT):
+        hits = [i for i in range(len(self.foods)) if self._matches(i, diet, meal)]
+        hits.sort(key=lambda i: abs(self.foods[i]["calories"] - kcal))
+        return [self._public(self.foods[i]) for i in hits[:limit]]
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(foods=len(self.foods))
+        return stats
+
+
+def catalog_path(url=CATALOG_URL):
+    """File behind a sqlite:/// catalog URL (sqlite:////abs/path), else None."""
+    return url[len("sqlite:///"):] if url.startswith("sqlite:///") else None
+
+
+def make_catalog(url=CATALOG_URL):
+    path = catalog_path(url)
+    if path:
+        try:
+            return SQLiteCatalog(path)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"⚠️  Food catalog unavailable ({e}); searching curated foods only.")
+    from utils import CURATED_DB
+    return MemoryCatalog(curated_foods(CURATED_DB))
+
+
+# ---------------------------
+# IMPORT
+# ---------------------------
+
+def curated_foods(curated_db):
+    """CURATED_DB as catalog food dicts; diet bits from the name plus the list the entry sits in."""
+    list_bits = {"veg": VEG, "vegan": VEG | VEGAN, "non-veg": 0}
+    foods = {}
+    for diet, meals in curated_db.items():
+        for meal, options in meals.items():
+            for option in options:
+                food = foods.setdefault((option["name"], meal), {
+                    "id": len(foods) + 1,
+                    "name": option["name"],
+                    "source": "curated",
+                    "meal": meal,
+                    "calories": float(option["calories"]),
+                    "protein": float(option.get("p", 0)),
+                    "carbs": float(option.get("c", 0)),
+                    "fats": float(option.get("f", 0)),
+                    "grams": option.get("g"),
+                    "diet_flags": 0,
+                })
+                food["diet_flags"] |= list_bits.get(diet, 0)
+    foods = list(foods.values())
+    for food, flags in zip(foods, diet_flags([food["name"] for food in foods]).tolist()):
+        food["diet_flags"] |= flags
+    return foods
+
+
+def frame_foods(df, source):
+    """Catalog food dicts for a normalize_food_dataframe() frame (names title-cased like FoodIndex)."""
+    if df is None or df.empty or "calories" not in df.columns or "food" not in df.columns:
+        return []
+    names = df["food"].fillna("").astype(str).str.strip().str.title()
+    flags = df["diet_flags"] if "diet_flags" in df.columns else pd.Series(diet_flags(names), index=df.index)
+    grams = df["grams"] if "grams" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    frame = pd.DataFrame({
+        "name": names, "calories": df["calories"], "protein": df["p"], "carbs": df["c"],
+        "fats": df["f"], "grams": grams, "diet_flags": flags,
+    })
+    frame = frame[frame["name"] != ""]
+    return [dict(food, source=source, meal=None) for food in frame.to_dict("records")]
+
+
+def write_catalog(foods, path):
+    """Write foods into a fresh SQLite file and atomically replace `path` with it."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO foods (name, search_name, source, meal, calories, protein, carbs, fats, grams, diet_flags) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((food["name"], " " + " ".join(search_tokens(food["name"])), food["source"], food["meal"],
+              float(food["calories"]), float(food["protein"]), float(food["carbs"]), float(food["fats"]),
+              None if pd.isna(food["grams"]) else float(food["grams"]), int(food["diet_flags"]))
+             for food in foods),
+        )
+        conn.execute("CREATE INDEX foods_calories ON foods (calories)")
+        for key, bits in DIET_REQUIRE.items():
+            if bits:
+                conn.execute(f"CREATE INDEX foods_{key}_calories ON foods (calories) WHERE diet_flags & {bits}")
+        try:
+            conn.execute(FTS_SCHEMA)
+            names = conn.execute("SELECT id, name, diet_flags FROM foods").fetchall()
+            conn.executemany("INSERT INTO foods_fts (rowid, name, diet) VALUES (?, ?, ?)",
+                             ((i, name, diet_terms(flags)) for i, name, flags in names))
+            conn.execute("INSERT INTO foods_fts (foods_fts) VALUES ('optimize')")
+            fts = True
+        except sqlite3.OperationalError:
+            print("⚠️  SQLite built without FTS5; name search falls back to LIKE.")
+            fts = False
+        rows = conn.execute("SELECT count(*) FROM foods").fetchone()[0]
+        meta = {"version": CATALOG_VERSION, "fts": int(fts), "rows": rows,
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return rows
+
+
+def read_catalog_frame(path=None):
+    """The catalog's non-curated foods as a normalized food dataframe (for FoodIndex), or None."""
+    path = catalog_path() if path is None else path
+    if not path or not os.path.isfile(path):
+        return None
+    conn = sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True)
+    try:
+        df = pd.read_sql_query(
+            "SELECT name AS food, calories, protein AS p, carbs AS c, fats AS f, diet_flags "
+            "FROM foods WHERE source != 'curated'", conn)
+    finally:
+        conn.close()
+    return df if len(df) else None
+
+
+def build_catalog(path=CATALOG_PATH, dataset=True, csv_paths=()):
+    from utils import CURATED_DB, load_food_dataframe, normalize_food_dataframe
+
+    # Import order is search order: curated, then our own foods, then the dataset
+    foods = curated_foods(CURATED_DB)
+    for csv_path in csv_paths:
+        foods += frame_foods(normalize_food_dataframe(pd.read_csv(csv_path)), "custom")
+    if dataset:
+        dataset_foods = frame_foods(load_food_dataframe(), "dataset")
+        if not dataset_foods:
+            print("⚠️  Food dataset unavailable; importing the other sources only.")
+        foods += dataset_foods
+    rows = write_catalog(foods, path)
+    print(f"💾 Food catalog written to {path} ({rows} foods).")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import curated, dataset and extra foods into the SQLite catalog.")
+    parser.add_argument("--out", default=CATALOG_PATH, help="catalog file")
+    parser.add_argument("--no-dataset", action="store_true", help="skip the Hugging Face dataset")
+    parser.add_argument("--csv", action="append", default=[], help="extra foods CSV (repeatable)")
+    args = parser.parse_args()
+    build_catalog(args.out, dataset=not args.no_dataset, csv_paths=args.csv)
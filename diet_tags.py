@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# DIET TAGGING
+# ----------------------------------------------------------------------
+# Run once when the food dataset is built (normalize_food_dataframe). Names
+# are lower-cased and letter-only, known plant phrases are rewritten
+# (EXCEPTIONS, PLANT_QUALIFIERS: "eggplant", "peanut butter", "goat cheese"
+# -> "cheese"), then one regex pass per flag looks for keyword stems
+# anywhere in the name, so compounds ("catfish", "porkchop", "cheesecake")
+# and plurals ("anchovies") are caught. Stems that are common inside
+# unrelated words ("ham" in "graham") only match as whole words. A name
+# marked free of dairy/egg ("dairy free ice cream") has that flag cleared.
+# The result is a compact uint8 bit-flag column; request-time diet filters
+# are then plain bitmask tests. Erring towards non-veg is the safe side.
+DAIRY = 1 << 0
+EGG = 1 << 1
+MEAT = 1 << 2
+FISH = 1 << 3
+HONEY = 1 << 4
+VEG = 1 << 6      # derived: no MEAT / FISH / EGG
+VEGAN = 1 << 7    # derived: VEG and no DAIRY / HONEY
+
+NON_VEG_MASK = MEAT | FISH | EGG
+NON_VEGAN_MASK = NON_VEG_MASK | DAIRY | HONEY
+
+KEYWORDS = {
+    DAIRY: ["milk", "cheese", "butter", "yogurt", "yoghurt", "curd", "cream", "ghee", "paneer",
+            "whey", "lassi", "custard", "mozzarella", "cheddar", "parmesan", "kefir", "gelato",
+            "ricotta", "mascarpone", "feta", "gouda", "brie", "halloumi", "burrata", "queso",
+            "kulfi", "kheer", "rabri", "khoya", "khoa", "malai", "raita", "lasagna", "lasagne", "parmigiano",
+            "tiramisu", "eggnog", "alfredo", "bechamel", "quiche", "flan", "brioche", "casein"],
+    EGG: ["egg", "omelette", "omelet", "mayonnaise", "mayo", "meringue", "tiramisu", "quiche",
+          "souffle", "frittata", "carbonara", "hollandaise", "aioli", "custard", "flan",
+          "pavlova", "macaron", "brioche"],
+    MEAT: ["chicken", "mutton", "beef", "pork", "ham", "bacon", "sausage", "lamb", "turkey", "veal",
+           "salami", "pepperoni", "keema", "duck", "goat", "venison", "meat", "steak", "gelatin",
+           "hamburger", "hot dog", "hotdog", "chorizo", "prosciutto", "pastrami", "brisket",
+           "jerky", "lard", "liver", "bone broth", "rabbit", "quail", "pancetta", "mince"],
+    FISH: ["fish", "shrimp", "prawn", "salmon", "tuna", "crab", "lobster", "cod", "sardine",
+           "anchovy", "mackerel", "oyster", "clam", "mussel", "squid", "tilapia", "scallop",
+           "calamari", "octopus", "caviar", "herring", "trout", "haddock", "halibut", "pollock",
+           "surimi", "roe", "eel", "seafood", "shellfish"],
+    HONEY: ["honey"],
+}
+
+# Stems found inside unrelated words ("graham", "collard", "peel", "rose",
+# "deliver", "reveal"): whole words only
+WHOLE_WORDS = {"ham", "cod", "lard", "roe", "eel", "brie", "flan", "feta", "khoa", "mince", "liver", "veal"}
+
+# Phrase -> replacement, applied before keyword matching
+EXCEPTIONS = {
+    "eggplant": "", "veggie": "", "vegg": "", "butternut": "", "butter bean": "", "butterbean": "",
+    "buttercup": "", "bean curd": "", "honeydew": "", "cream of tartar": "", "crab apple": "",
+    "crabapple": "", "lambs lettuce": "", "beefsteak tomato": "", "duckweed": "", "coconut meat": "",
+    "goat cheese": "cheese", "goats cheese": "cheese", "goat milk": "milk", "goats milk": "milk",
+    "reggiano": "cheese",
+}
+
+# Flag -> markers meaning every such ingredient in the name is a substitute
+# ("dairy free ice cream", "ice cream dairy free", "eggless cake")
+FREE_OF = {
+    DAIRY: ["dairy free", "non dairy", "nondairy", "milk free"],
+    EGG: ["egg free", "eggless"],
+}
+
+# A dairy/egg word right after one of these is a plant product ("peanut
+# butter", "almond milk", "coconut cream", "vegan mayo"), not dairy/egg.
+PLANT_QUALIFIERS = {
+    "peanut", "almond", "cashew", "coconut", "soy", "soya", "oat", "rice", "cocoa", "cacao",
+    "apple", "shea", "nut", "vegan", "plant", "sunflower", "hazelnut", "pistachio",
+}
+PLANT_PRODUCTS = ["butter", "milk", "cream", "cheese", "yogurt", "yoghurt", "curd", "mayo", "mayonnaise"]
+
+
+def _forms(word):
+    """A keyword and its plurals: s/es, y -> ies ("anchovies"), f/fe -> ves."""
+    forms = {word, word + "s", word + "es"}
+    if word.endswith("y"):
+        forms.add(word[:-1] + "ies")
+    if word.endswith("fe"):
+        forms.add(word[:-2] + "ves")
+    elif word.endswith("f"):
+        forms.add(word[:-1] + "ves")
+    return forms
+
+
+def _alternation(words):
+    # Keywords are letters and spaces only: no escaping, so the same pattern
+    # runs on Python's re and on pyarrow's RE2 (pandas' str dtype)
+    assert all(w.replace(" ", "").isalpha() for w in words)
+    # Longest first so the regex engine prefers whole phrases
+    return "|".join(sorted(words, key=len, reverse=True))
+
+
+def _flag_patterns():
+    patterns = {}
+    for flag, words in KEYWORDS.items():
+        stems = {form for w in words if w not in WHOLE_WORDS for form in _forms(w)}
+        whole = {form for w in words if w in WHOLE_WORDS for form in _forms(w)}
+        parts = [f"(?:{_alternation(stems)})"] if stems else []
+        if whole:
+            parts.append(rf"\b(?:{_alternation(whole)})\b")
+        patterns[flag] = "|".join(parts)
+    return patterns
+
+
+def _rewrite_patterns():
+    """(pattern, replacement) passes: plant qualifier phrases, then EXCEPTIONS grouped by replacement."""
+    products = {form for w in PLANT_PRODUCTS for form in _forms(w)}
+    passes = [(rf"\b(?:{_alternation(PLANT_QUALIFIERS)}) (?:{_alternation(products)})\b", " ")]
+    for replacement in sorted(set(EXCEPTIONS.values())):
+        phrases = [phrase for phrase, r in EXCEPTIONS.items() if r == replacement]
+        passes.append((_alternation(phrases), f" {replacement} "))
+    return passes
+
+
+FLAG_PATTERNS = _flag_patterns()
+REWRITES = _rewrite_patterns()
+FREE_PATTERNS = {flag: rf"\b(?:{_alternation(words)})\b" for flag, words in FREE_OF.items()}
+
+
+def diet_flags(names):
+    """uint8 flag array for a sequence/Series of food names (vectorized)."""
+    names = pd.Series(names, dtype=object).reset_index(drop=True).fillna("").astype(str)
+    if names.empty:
+        return np.zeros(0, dtype=np.uint8)
+
+    text = names.str.lower().str.replace("[\u2019']", "", regex=True).str.replace("[^a-z]+", " ", regex=True)
+    # Tag each distinct letters-only name once (datasets repeat names a lot)
+    codes, uniques = pd.factorize(text)
+    text = pd.Series(uniques, dtype=text.dtype)
+    for pattern, replacement in REWRITES:
+        text = text.str.replace(pattern, replacement, regex=True)
+
+    flags = np.zeros(len(uniques), dtype=np.uint8)
+    for flag, pattern in FLAG_PATTERNS.items():
+        flags[text.str.contains(pattern, regex=True).to_numpy(dtype=bool)] |= np.uint8(flag)
+    for flag, pattern in FREE_PATTERNS.items():
+        flags[text.str.contains(pattern, regex=True).to_numpy(dtype=bool)] &= np.uint8(~flag & 0xFF)
+
+    flags |= np.where(flags & NON_VEG_MASK, 0, VEG).astype(np.uint8)
+    flags |= np.where(flags & NON_VEGAN_MASK, 0, VEGAN).astype(np.uint8)
+    return flags[codes]
+
+
+def describe(flags):
+    """Readable tag list for one flag value, e.g. ['veg', 'dairy']."""
+    names = {VEG: "veg", VEGAN: "vegan", DAIRY: "dairy", EGG: "egg", MEAT: "meat", FISH: "fish", HONEY: "honey"}
+    return [name for bit, name in names.items() if flags & bit]
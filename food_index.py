@@ -0,0 +1,155 @@
+import numpy as np
+from diet_tags import VEG, VEGAN, diet_flags
+
+# ----------------------------------------------------------------------
+# DIET-PARTITIONED FOOD INDEX
+# ----------------------------------------------------------------------
+# Built once from the normalized food dataframe. Every column is stored
+# sorted by calories, so each diet partition is just an ascending list of
+# row ids plus its own (sorted) calorie array for binary search.
+DIET_KEYS = ("veg", "non-veg", "vegan")
+
+# diet key -> diet_tags bits a row must carry to be in that partition
+DIET_REQUIRE = {"veg": VEG, "non-veg": 0, "vegan": VEGAN}
+
+
+def diet_key(diet_pref):
+    """Map a free-form diet preference ("Non-Veg", "vegan", ...) to a DIET_KEYS entry."""
+    diet_pref = str(diet_pref).lower()
+    if "non" in diet_pref:
+        return "non-veg"
+    if "vegan" in diet_pref:
+        return "vegan"
+    return "veg"
+
+
+def _frozen(arr, dtype):
+    arr = np.ascontiguousarray(arr, dtype=dtype)
+    arr.setflags(write=False)
+    return arr
+
+
+class FoodIndex:
+    """
+    Read-only view of the food dataset, partitioned by diet.
+    Use FoodIndex.from_dataframe() to build one and nearest() to query it.
+    """
+    __slots__ = ("names", "calories", "protein", "carbs", "fats", "diet_flags", "partitions")
+
+    def __init__(self, names, calories, protein, carbs, fats, diet_flags, partitions):
+        self.names = names
+        self.calories = calories
+        self.protein = protein
+        self.carbs = carbs
+        self.fats = fats
+        self.diet_flags = diet_flags  # uint8 diet_tags bits per row
+        # diet key -> (row ids, calories of those rows), both sorted by calories
+        self.partitions = partitions
+
+    @classmethod
+    def empty(cls):
+        no_rows = _frozen([], np.int32)
+        no_vals = _frozen([], np.float64)
+        partitions = {key: (no_rows, no_vals) for key in DIET_KEYS}
+        return cls([], no_vals, no_vals, no_vals, no_vals, _frozen([], np.uint8), partitions)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        if df is None or df.empty or "calories" not in df.columns:
+            return cls.empty()
+
+        calories = df["calories"].to_numpy(dtype=np.float64)
+        order = np.argsort(calories, kind="stable")
+
+        if "food" in df.columns:
+            food = df["food"].fillna("").astype(str)
+        else:
+            food = df.index.astype(str).to_series()
+        names = food.str.title().to_numpy(dtype=object)[order]
+
+        def column(name):
+            if name not in df.columns:
+                return _frozen(np.zeros(len(order)), np.float64)
+            return _frozen(df[name].to_numpy(dtype=np.float64)[order], np.float64)
+
+        if "diet_flags" in df.columns:
+            flags = df["diet_flags"].to_numpy(dtype=np.uint8)[order]
+        else:
+            flags = diet_flags(food)[order]
+        flags = _frozen(flags, np.uint8)
+
+        sorted_cal = _frozen(calories[order], np.float64)
+        partitions = {}
+        for key, require in DIET_REQUIRE.items():
+            rows = np.flatnonzero((flags & require) == require)
+            partitions[key] = (_frozen(rows, np.int32), _frozen(sorted_cal[rows], np.float64))
+
+        names.setflags(write=False)
+        return cls(names, sorted_cal, column("p"), column("c"), column("f"), flags, partitions)
+
+    def __len__(self):
+        return len(self.calories)
+
+    def mask(self, require=0, exclude=0):
+        """Boolean row mask: all `require` bits set and no `exclude` bits (diet_tags flags)."""
+        return ((self.diet_flags & require) == require) & ((self.diet_flags & exclude) == 0)
+
+    def size(self, diet):
+        return len(self.partitions[diet_key(diet)][0])
+
+    def nearest(self, diet, target_kcal, k=20):
+        """
+        Row ids of the k foods closest to target_kcal, considering only foods
+        at most 10% above the target (all foods when none qualify).
+        """
+        rows, cal = self.partitions[diet_key(diet)]
+        n = len(cal)
+        if n == 0:
+            return rows
+
+        hi = int(np.searchsorted(cal, target_kcal * 1.1, side="right")) or n
+        pos = min(int(np.searchsorted(cal, target_kcal)), hi)
+        # The k nearest values form a contiguous run around pos.
+        lo, up = max(0, pos - k), min(hi, pos + k)
+        if up - lo <= k:
+            return rows[lo:up]
+        diff = np.abs(cal[lo:up] - target_kcal)
+        return rows[lo + np.argpartition(diff, k - 1)[:k]]
+
+    def sample_nearest(self, diet, targets, rng, k=20):
+        """
+        Vectorized nearest() for many targets at once: one random row id per
+        target, drawn from its k nearest foods. `rng` is a numpy Generator.
+        """
+        rows, cal = self.partitions[diet_key(diet)]
+        n = len(cal)
+        targets = np.asarray(targets, dtype=np.float64)
+        if n == 0:
+            return np.full(len(targets), -1, dtype=np.int64)
+
+        hi = np.searchsorted(cal, targets * 1.1, side="right")
+        hi[hi == 0] = n
+        pos = np.minimum(np.searchsorted(cal, targets), hi)
+        lo = np.maximum(0, pos - k)
+        up = np.minimum(hi, pos + k)
+
+        # (targets, 2k) window of candidate offsets; out-of-window slots sort last
+        offsets = lo[:, None] + np.arange(2 * k)
+        valid = offsets < up[:, None]
+        offsets = np.minimum(offsets, n - 1)
+        diff = np.where(valid, np.abs(cal[offsets] - targets[:, None]), np.inf)
+        best = np.argsort(diff, axis=1, kind="stable")[:, :k]
+
+        counts = np.minimum(up - lo, k)
+        pick = (rng.random(len(targets)) * counts).astype(np.int64)
+        chosen = offsets[np.arange(len(targets)), best[np.arange(len(targets)), pick]]
+        return rows[chosen]
+
+    def row(self, i):
+        return {
+            "name": self.names[i],
+            "calories": self.calories[i],
+            "p": self.protein[i],
+            "c": self.carbs[i],
+            "f": self.fats[i],
+        }
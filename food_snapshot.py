@@ -0,0 +1,116 @@
+import os
+import json
+import argparse
+import numpy as np
+from food_index import FoodIndex, DIET_KEYS
+from artifact_dir import publish_dir, load_npy_dir
+
+# ----------------------------------------------------------------------
+# OFFLINE FOOD SNAPSHOT
+# ----------------------------------------------------------------------
+# A snapshot is a directory of plain .npy column files (already sorted by
+# calories, i.e. exactly the arrays a FoodIndex holds) plus meta.json.
+# Workers np.load() them with mmap_mode="r", so every gunicorn worker on a
+# box shares the same page-cache pages and no pickling/network is needed.
+# Rebuilds are published with an atomic symlink swap (artifact_dir.py).
+#
+# Food names are variable length, so they are stored as one UTF-8 blob
+# (food.bin.npy) plus an offsets array (food.offsets.npy).
+SNAPSHOT_VERSION = 2
+
+NUMERIC_COLUMNS = {
+    "calories": ("calories", np.float64),
+    "p": ("protein", np.float64),
+    "c": ("carbs", np.float64),
+    "f": ("fats", np.float64),
+    "diet_flags": ("diet_flags", np.uint8),
+}
+
+
+class MappedStrings:
+    """Sequence of str backed by a memory-mapped UTF-8 blob and offsets array."""
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _partition_files(key):
+    return f"part.{key}.rows", f"part.{key}.calories"
+
+
+def _snapshot_arrays():
+    partitions = [name for key in DIET_KEYS for name in _partition_files(key)]
+    return ["food.bin", "food.offsets", *NUMERIC_COLUMNS, *partitions]
+
+
+def write_snapshot(index, path, source=""):
+    """Write a FoodIndex to `path`, replacing any existing snapshot atomically (see artifact_dir.py)."""
+    if len(index) == 0:
+        raise ValueError("refusing to write an empty food snapshot")
+
+    def write(directory):
+        def save(name, array):
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+
+        encoded = [str(name).encode("utf-8") for name in index.names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        save("food.bin", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        save("food.offsets", offsets)
+
+        for column, (attr, dtype) in NUMERIC_COLUMNS.items():
+            save(column, np.asarray(getattr(index, attr), dtype=dtype))
+
+        for key in DIET_KEYS:
+            rows, cal = index.partitions[key]
+            rows_file, cal_file = _partition_files(key)
+            save(rows_file, np.asarray(rows, dtype=np.int32))
+            save(cal_file, np.asarray(cal, dtype=np.float64))
+
+        meta = {"version": SNAPSHOT_VERSION, "rows": len(index), "source": source}
+        with open(os.path.join(directory, "meta.json"), "w") as fh:
+            json.dump(meta, fh, indent=2)
+
+    publish_dir(path, write)
+
+
+def load_snapshot(path):
+    """Memory-map a snapshot written by write_snapshot() as a read-only FoodIndex."""
+    _, arrays = load_npy_dir(path, _snapshot_arrays(), SNAPSHOT_VERSION, kind="snapshot")
+    names = MappedStrings(arrays["food.bin"], arrays["food.offsets"])
+    columns = {attr: arrays[column] for column, (attr, _) in NUMERIC_COLUMNS.items()}
+    partitions = {key: tuple(arrays[f] for f in _partition_files(key)) for key in DIET_KEYS}
+    return FoodIndex(names=names, partitions=partitions, **columns)
+
+
+def build_snapshot(path):
+    """Fetch + normalize the Hugging Face dataset and write it as a snapshot."""
+    from utils import load_food_dataframe, FOOD_DATASET
+
+    df = load_food_dataframe()
+    if df is None:
+        raise SystemExit("❌ Food dataset unavailable; snapshot not written.")
+    index = FoodIndex.from_dataframe(df)
+    write_snapshot(index, path, source=FOOD_DATASET)
+    print(f"💾 Food snapshot written to {path} ({len(index)} foods).")
+
+
+if __name__ == "__main__":
+    from utils import FOOD_SNAPSHOT_PATH
+
+    parser = argparse.ArgumentParser(description="Build the offline food dataset snapshot.")
+    parser.add_argument("--out", default=FOOD_SNAPSHOT_PATH, help="snapshot directory")
+    build_snapshot(parser.parse_args().out)
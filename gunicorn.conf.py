@@ -0,0 +1,14 @@
+# gunicorn.conf.py
+# ----------------------------------------------------------------------
+# GUNICORN HOOKS
+# ----------------------------------------------------------------------
+# Read automatically by `gunicorn app:app` (Procfile) and
+# `gunicorn asgi:app -k uvicorn.workers.UvicornWorker` started from this
+# directory. Settings stay on the command line / GUNICORN_CMD_ARGS.
+
+
+def worker_exit(server, worker):
+    # Workers leave through os._exit, skipping atexit: stop the plan pool and
+    # remove its shared copies in /dev/shm here
+    from app import close_plan_pool
+    close_plan_pool()
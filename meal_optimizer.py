@@ -0,0 +1,243 @@
+import time
+import random
+import numpy as np
+from itertools import islice
+from collections import deque
+from functools import lru_cache
+from food_index import diet_key
+from utils import CURATED_DB, MEAL_WEIGHTS, load_food_index, plan_totals, curated_serving
+from portions import MIN_SERVINGS, MAX_SERVINGS, gram_servings, portion_grid, portion_label, scale_servings
+from metrics import MEAL_PICKS
+
+# ----------------------------------------------------------------------
+# MEAL PLAN OPTIMIZER
+# ----------------------------------------------------------------------
+# Picks an item + portion for all four meals together so the day's totals
+# land on the calorie and calculate_macros targets:
+#   1. candidates per meal: curated options and the dataset foods nearest
+#      the meal's calorie share, each at every PORTIONS size (the portion
+#      engine's steps and bounds; items with a known serving weight are
+#      rounded to whole GRAM_STEP grams, as fit_servings does)
+#   2. keep the TOP_PER_MEAL candidates closest to the meal's share
+#   3. score the combinations of those (up to TOP_PER_MEAL ** 4), one
+#      first-meal candidate (best first) per broadcast, and pick randomly
+#      among the near-best ones for variety
+PORTIONS = tuple(portion_grid(MIN_SERVINGS, MAX_SERVINGS).tolist())
+TOP_PER_MEAL = 12
+DATASET_CANDIDATES = 20
+
+# Relative weight of calories vs each macro in the deviation score
+CALORIE_WEIGHT = 4.0
+MACRO_WEIGHT = 1.0
+
+# Seconds per day. Past this, remaining meals' shortlists are cut to their
+# single closest candidate and the joint search stops after the current
+# first-meal candidate, keeping the best combinations found so far.
+TIME_BUDGET = 0.05
+
+
+@lru_cache(maxsize=None)
+def _curated_candidates(diet, meal_name):
+    options = CURATED_DB.get(diet, {}).get(meal_name, [])
+    servings = [curated_serving(o) for o in options]
+    names = [o["name"] for o in options]
+    values = np.array([v for v, _ in servings], dtype=np.float64).reshape(-1, 4)
+    grams = np.array([g for _, g in servings], dtype=np.float64)
+    return names, values, grams
+
+
+def _meal_candidates(diet, meal_name, meal_target, index):
+    """
+    (names, per-serving [kcal, p, c, f] rows, serving grams (NaN: unknown),
+    number of curated entries) for one meal, before portions. Curated
+    entries come first.
+    """
+    names, values, grams = _curated_candidates(diet, meal_name)
+    curated = len(names)
+    names, values = list(names), [values]
+    if index is not None and index.size(diet):
+        for row_id in index.nearest(diet, meal_target[0], k=DATASET_CANDIDATES):
+            row = index.row(row_id)
+            names.append(row["name"])
+            values.append([[row["calories"], row["p"], row["c"], row["f"]]])
+    values = np.concatenate(values) if names else np.zeros((0, 4))
+    grams = np.concatenate([grams, np.full(len(names) - curated, np.nan)])
+    if not names:
+        # Same estimate pick_from_curated falls back to
+        kcal = meal_target[0]
+        names = ["Healthy Choice"]
+        values = np.array([[kcal, kcal * 0.2 / 4, kcal * 0.5 / 4, kcal * 0.3 / 9]])
+        grams = np.array([np.nan])
+        curated = 1
+    return names, values, grams, curated
+
+
+def _deviation(totals, target):
+    """Weighted squared relative deviation from target, over the last axis."""
+    rel = (totals - target) / np.maximum(target, 1.0)
+    weights = np.array([CALORIE_WEIGHT, MACRO_WEIGHT, MACRO_WEIGHT, MACRO_WEIGHT])
+    return (rel * rel * weights).sum(axis=-1)
+
+
+def _plan_candidates(target, diet, index):
+    """
+    Per meal: (meal target, names, scaled [kcal, p, c, f] rows, curated
+    count, multiplier per row, serving grams per item). Independent of the
+    day, so a multi-day plan builds it once.
+    """
+    portions = np.array(PORTIONS)
+    candidates = []
+    for meal_name in MEAL_WEIGHTS:
+        meal_target = target * MEAL_WEIGHTS[meal_name]
+        names, per_serving, grams, curated = _meal_candidates(diet, meal_name, meal_target, index)
+        # (candidates * portions, 4); row i*len(PORTIONS)+j = item i at portion j
+        multipliers = gram_servings(np.tile(portions, len(per_serving)), grams.repeat(len(portions)))
+        multipliers = np.minimum(np.maximum(multipliers, MIN_SERVINGS), MAX_SERVINGS)
+        scaled = scale_servings(per_serving.repeat(len(portions), axis=0), multipliers).astype(np.float64)
+        candidates.append((meal_name, meal_target, names, scaled, curated, multipliers, grams))
+    return candidates
+
+
+def _solve_day(candidates, target, np_rng, deadline, recent=None):
+    """
+    Joint search for one day. `recent` maps meal name -> RecentItems whose
+    names are skipped (only the newest ones when that would block them all).
+    Returns the plan, {meal name: [item dict]}; callers read the chosen
+    names from plan[meal][0]["name"].
+    """
+    shortlists = []
+    for meal_name, meal_target, names, scaled, curated, _, _ in candidates:
+        score = _deviation(scaled, meal_target) + np_rng.random(len(scaled)) * 1e-3
+        if recent is not None and len(recent[meal_name]):
+            blocked = np.array([name in recent[meal_name] for name in names])
+            if blocked.all():
+                # Fewer options than the window: only block the most recent ones
+                newest = set(recent[meal_name].last(len(set(names)) - 1))
+                blocked = np.array([name in newest for name in names])
+            score[blocked.repeat(len(PORTIONS))] = np.inf
+        keep = np.argsort(score)[:TOP_PER_MEAL]
+        keep = keep[np.isfinite(score[keep])]
+        if time.perf_counter() > deadline:
+            keep = keep[:1]
+        shortlists.append((names, scaled, keep, curated))
+
+    # Joint search: every combination of the other meals' shortlists is
+    # summed once, then scored against each first-meal candidate in turn
+    # (closest first) until done or past the deadline
+    (_, first_scaled, first_keep, _), rest = shortlists[0], shortlists[1:]
+    grids = np.meshgrid(*[np.arange(len(keep)) for _, _, keep, _ in rest], indexing="ij")
+    rest_combos = np.stack([g.ravel() for g in grids], axis=1)
+    rest_totals = sum(scaled[keep][rest_combos[:, m]] for m, (_, scaled, keep, _) in enumerate(rest))
+    top = min(5, len(rest_combos))
+    objectives, combos = [], []
+    for i, row in enumerate(first_scaled[first_keep]):
+        objective = _deviation(rest_totals + row, target)
+        best = np.argpartition(objective, top - 1)[:top]
+        objectives.append(objective[best])
+        combos.append(np.column_stack([np.full(top, i), rest_combos[best]]))
+        if time.perf_counter() > deadline:
+            break
+    objective, combos = np.concatenate(objectives), np.concatenate(combos)
+
+    best = np.argsort(objective, kind="stable")[:5]
+    near_best = best[objective[best] <= objective[best[0]] * 2 + 1e-3]
+    chosen = combos[near_best[np_rng.integers(len(near_best))]]
+
+    plan = {}
+    for (meal_name, *_, multipliers, grams), (names, scaled, keep, curated), pick in zip(candidates, shortlists, chosen):
+        flat = keep[pick]
+        item = int(flat) // len(PORTIONS)
+        MEAL_PICKS.inc(source="curated" if item < curated else "dataset")
+        kcal, p, c, f = scaled[flat]
+        plan[meal_name] = [{
+            "name": names[item],
+            "calories": int(kcal),
+            "protein": int(p),
+            "carbs": int(c),
+            "fats": int(f),
+            "portion": portion_label(multipliers[flat], grams[item]),
+        }]
+    return plan
+
+
+def _targets(target_calories, macros):
+    return np.array([target_calories, macros["protein_g"], macros["carbs_g"], macros["fat_g"]], dtype=np.float64)
+
+
+def optimize_meal_plan(target_calories, macros, diet_pref="Veg", index=None, rng=None,
+                       time_budget=TIME_BUDGET):
+    """
+    Returns (plan, totals). plan has the same shape as utils.get_meal_plan;
+    totals is {"target": {...}, "actual": {...}} in kcal and grams.
+    """
+    deadline = time.perf_counter() + time_budget
+    index = load_food_index() if index is None else index
+    rng = random if rng is None else rng
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    target = _targets(target_calories, macros)
+
+    candidates = _plan_candidates(target, diet_key(diet_pref), index)
+    plan = _solve_day(candidates, target, np_rng, deadline)
+    return plan, plan_totals(plan, target_calories, macros)
+
+
+# ----------------------------------------------------------------------
+# MULTI-DAY PLANS
+# ----------------------------------------------------------------------
+# Candidates are built once for the whole plan; each day is then one
+# _solve_day() with that meal's recently served items blocked. Days are
+# yielded as they are solved, so callers can stream them and memory does
+# not grow with the number of days.
+MAX_PLAN_DAYS = 90
+VARIETY_DAYS = 3
+
+
+class RecentItems:
+    """The last `window` names served for one meal: deque for order, counts for O(1) lookups."""
+    __slots__ = ("window", "order", "counts")
+
+    def __init__(self, window):
+        self.window = window
+        self.order = deque()
+        self.counts = {}
+
+    def add(self, name):
+        if self.window <= 0:
+            return
+        self.order.append(name)
+        self.counts[name] = self.counts.get(name, 0) + 1
+        if len(self.order) > self.window:
+            old = self.order.popleft()
+            self.counts[old] -= 1
+            if not self.counts[old]:
+                del self.counts[old]
+
+    def last(self, n):
+        """The n most recently added names, newest first."""
+        return list(islice(reversed(self.order), n))
+
+    def __contains__(self, name):
+        return name in self.counts
+
+    def __len__(self):
+        return len(self.order)
+
+
+def iter_meal_plans(target_calories, macros, diet_pref="Veg", days=7, variety_days=VARIETY_DAYS,
+                    index=None, rng=None, time_budget=TIME_BUDGET):
+    """
+    Yield {"day", "plan", "totals"} for days 1..days. A meal's item is not
+    repeated within `variety_days` days while other candidates remain.
+    """
+    index = load_food_index() if index is None else index
+    rng = random if rng is None else rng
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    target = _targets(target_calories, macros)
+
+    candidates = _plan_candidates(target, diet_key(diet_pref), index)
+    recent = {meal_name: RecentItems(variety_days) for meal_name in MEAL_WEIGHTS}
+    for day in range(1, days + 1):
+        plan = _solve_day(candidates, target, np_rng, time.perf_counter() + time_budget, recent)
+        for meal_name, items in plan.items():
+            recent[meal_name].add(items[0]["name"])
+        yield {"day": day, "plan": plan, "totals": plan_totals(plan, target_calories, macros)}
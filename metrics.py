@@ -0,0 +1,197 @@
+import os
+import time
+import bisect
+import threading
+from flask import g, has_request_context
+
+# ----------------------------------------------------------------------
+# IN-PROCESS METRICS
+# ----------------------------------------------------------------------
+# Counters and histograms cheap enough to leave on in production (a lock
+# and a dict update per observation), rendered in Prometheus text format by
+# GET /metrics. Values are per worker process; Prometheus should scrape each
+# worker (or sum them) rather than expect one global view.
+SERVER_TIMING = os.environ.get("FITFUEL_SERVER_TIMING", "0") == "1"
+
+# Seconds; tuned for sub-ms planner stages up to multi-second cold loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-thread event list while inside recording() (see below)
+_LOCAL = threading.local()
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _record(("counter", self.name, amount, labels))
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(n, "") for n in self.labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        values = self._values if self._values or self.labels else {(): 0}
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                labels = _label_str(self.labels + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Register fn() -> list of exposition lines, evaluated at scrape time."""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for fn in self.collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "fitfuel_request_seconds", "HTTP request latency by route and status.", labels=("route", "status"))
+STAGE_SECONDS = REGISTRY.histogram(
+    "fitfuel_stage_seconds", "Time spent in each pipeline stage.", labels=("stage",))
+MEAL_PICKS = REGISTRY.counter(
+    "fitfuel_meal_picks_total", "Meal items served, by source (curated DB or food dataset).", labels=("source",))
+MODEL_FAILURES = REGISTRY.counter(
+    "fitfuel_model_failures_total", "Calorie model predictions that raised.")
+
+
+class span:
+    """
+    Time a block into fitfuel_stage_seconds{stage=name}. Inside a Flask
+    request the duration is also kept for the Server-Timing header.
+    """
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _observe_span(self.name, elapsed)
+        _record(("span", self.name, elapsed, None))
+        return False
+
+
+def _observe_span(name, elapsed):
+    STAGE_SECONDS.observe(elapsed, stage=name)
+    if SERVER_TIMING and has_request_context():
+        g.setdefault("server_timing", []).append((name, elapsed))
+
+
+# ---------------------------
+# CROSS-PROCESS RECORDING
+# ---------------------------
+# Plan pool children are never scraped: they run their work inside
+# recording(), return the events with the result, and the parent replay()s
+# them into its own metrics (and the request's Server-Timing).
+
+def _record(event):
+    events = getattr(_LOCAL, "events", None)
+    if events is not None:
+        events.append(event)
+
+
+class recording:
+    """Collect this thread's spans and counter increments in the block as picklable tuples."""
+    __slots__ = ("events", "outer")
+
+    def __enter__(self):
+        self.outer = getattr(_LOCAL, "events", None)
+        self.events = _LOCAL.events = []
+        return self.events
+
+    def __exit__(self, *exc):
+        _LOCAL.events = self.outer
+        return False
+
+
+def replay(events):
+    """Record events collected by recording() (in another process) as if they happened here."""
+    counters = {metric.name: metric for metric in REGISTRY.metrics if isinstance(metric, Counter)}
+    for kind, name, value, labels in events:
+        if kind == "span":
+            _observe_span(name, value)
+            _record(("span", name, value, None))
+        else:
+            counters[name].inc(value, **labels)
+
+
+def server_timing_header(total):
+    """Server-Timing value for the current request's spans plus the total."""
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in g.get("server_timing", [])]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
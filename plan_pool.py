@@ -0,0 +1,234 @@
+import os
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from multiprocessing.util import Finalize
+from utils import (calculate_macros, calculate_tdee, build_meal_plan, safe_load_model, compact_model_path,
+                   FOOD_SNAPSHOT_PATH, MODEL_PATH)
+from meal_optimizer import optimize_meal_plan
+from calorie_model import write_flat_model
+from food_index import FoodIndex
+from food_snapshot import MappedStrings, load_snapshot, write_snapshot
+from metrics import REGISTRY, MODEL_FAILURES, recording, replay, span
+
+# ----------------------------------------------------------------------
+# PLAN PROCESS POOL
+# ----------------------------------------------------------------------
+# Optional (FITFUEL_PLAN_POOL=N): /predict's meal plan and model inference
+# run in N child processes started at warm-up, so one web worker is no
+# longer held to one core by the GIL. Only the profile and the result cross
+# the process boundary; children find the food index and the model as
+# memory-mapped files (the food snapshot and compact model, or copies
+# written once to SHARED_DIR), so every child shares the same pages.
+#
+# Backpressure: at most processes + POOL_QUEUE requests are in flight.
+# Beyond that run() raises PoolSaturated at once (503 + Retry-After), and a
+# request waiting longer than POOL_TIMEOUT raises PoolTimeout (504). A
+# timed-out task keeps its slot until its child finishes, so a stuck pool
+# sheds new load instead of queueing it.
+#
+# Shutdown: close() stops the children and removes the shared copies (they
+# live in RAM on tmpfs). Servers call it on the way out (asgi.py lifespan,
+# gunicorn.conf.py worker_exit); a multiprocessing finalizer covers every
+# other normal exit, including uvicorn workers, which skip atexit.
+POOL_PROCESSES = int(os.environ.get("FITFUEL_PLAN_POOL", "0"))
+POOL_TIMEOUT = float(os.environ.get("FITFUEL_POOL_TIMEOUT", "5"))
+POOL_QUEUE = int(os.environ.get("FITFUEL_POOL_QUEUE", POOL_PROCESSES))
+RETRY_AFTER = 1  # seconds
+
+# tmpfs where available: shared copies then never touch the disk
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+POOL_TASKS = REGISTRY.counter(
+    "fitfuel_plan_pool_tasks_total", "Plan pool tasks by outcome.", labels=("outcome",))
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def profile_targets(data):
+    """(goal, tdee, macros) for a validated profile."""
+    # BMR (Mifflin–St Jeor) x activity, goal adjusted
+    goal = str(data["goal"]).lower()
+    tdee = calculate_tdee(data["weight"], data["height"], data["age"], data["gender"], data["activity"], goal)
+    return goal, tdee, calculate_macros(tdee, goal=goal)
+
+
+def plan_profile(data, index, model, rng=None, planner="optimize"):
+    """(tdee, macros, plan, totals, prediction) for one validated profile: the CPU-heavy part of /predict."""
+    _, tdee, macros = profile_targets(data)
+    with span("meal_plan"):
+        if planner == "optimize":
+            meal_plan, totals = optimize_meal_plan(tdee, macros, data["diet"], index=index, rng=rng)
+        else:
+            meal_plan, totals = build_meal_plan(tdee, macros, data["diet"], index=index, rng=rng)
+
+    # ML Prediction (kcal burned in a typical session for this activity level)
+    prediction = None
+    if model:
+        try:
+            with span("model_predict"):
+                prediction = float(model.predict_profiles(
+                    data["weight"], data["height"], data["age"], data["gender"], data["activity"])[0])
+        except Exception as e:
+            MODEL_FAILURES.inc()
+            print(f"❌ Calorie model prediction failed: {e}")
+    return tdee, macros, meal_plan, totals, prediction
+
+
+# ---------------------------
+# CHILD PROCESSES
+# ---------------------------
+
+_CHILD = {}
+_IN_CHILD = False
+
+
+def in_pool_child():
+    """True inside a pool child (set by its initializer). Not parent_process(): uvicorn --workers spawns its workers too."""
+    return _IN_CHILD
+
+
+def _init_child(index_path, model_path):
+    global _IN_CHILD
+    _IN_CHILD = True
+    _CHILD["index"] = load_snapshot(index_path) if index_path else FoodIndex.empty()
+    _CHILD["model"] = safe_load_model(model_path) if model_path else None
+
+
+def _ready():
+    return os.getpid()
+
+
+def _plan_task(data, rng, planner):
+    """(plan_profile() result, metric events) for PlanPool.run() to replay in the parent."""
+    with recording() as events:
+        result = plan_profile(data, _CHILD["index"], _CHILD["model"], rng, planner)
+    return result, events
+
+
+# ---------------------------
+# POOL
+# ---------------------------
+
+class PlanPool:
+    def __init__(self, processes, index, model, timeout=POOL_TIMEOUT, queue=POOL_QUEUE):
+        self.processes = processes
+        self.timeout = timeout
+        self.capacity = processes + max(queue, 0)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._shared_dir = None
+
+        try:
+            index_path = self._share_index(index)
+            model_path = self._share_model(model)
+            # Not fork: the parent already runs warm-up/server threads. The fork
+            # server imports this module (numpy, pandas, ...) once for all children.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self.pool = context.Pool(processes, initializer=_init_child, initargs=(index_path, model_path))
+        except BaseException:
+            _close_pool(None, self._shared_dir)
+            raise
+        # Runs once: from close(), or at exit after the Pool's own finalizer (priority 15)
+        self._finalizer = Finalize(self, _close_pool, args=(self.pool, self._shared_dir), exitpriority=10)
+        try:
+            # Wait for the children to map their data before taking traffic
+            self.pool.apply_async(_ready).get(60)
+        except BaseException:
+            self.close()
+            raise
+
+    def _shared_path(self, name):
+        if self._shared_dir is None:
+            self._shared_dir = tempfile.mkdtemp(prefix="fitfuel-pool-", dir=SHARED_DIR)
+        return os.path.join(self._shared_dir, name)
+
+    def _share_index(self, index):
+        """Snapshot directory the children map: the parent's own snapshot, or a copy of its index."""
+        if index is None or len(index) == 0:
+            return None
+        if isinstance(index.names, MappedStrings) and os.path.isdir(FOOD_SNAPSHOT_PATH):
+            return FOOD_SNAPSHOT_PATH
+        path = self._shared_path("food_snapshot")
+        write_snapshot(index, path, source="plan pool")
+        return path
+
+    def _share_model(self, model):
+        """Compact model directory the children map (a pickle path for the sklearn backend)."""
+        if model is None:
+            return None
+        compact = compact_model_path()
+        if compact:
+            return compact
+        if model.fast is None:
+            return MODEL_PATH  # sklearn backend: each child unpickles its own copy
+        path = self._shared_path("calorie_model.flat")
+        write_flat_model(model.fast, path, model.features, model.gender_mapping)
+        return path
+
+    def _finished(self, _):
+        with self._lock:
+            self.in_flight -= 1
+
+    def run(self, data, rng=None, planner="optimize"):
+        """plan_profile() in a child; raises PoolSaturated / PoolTimeout instead of queueing forever."""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                POOL_TASKS.inc(outcome="rejected")
+                raise PoolSaturated()
+            self.in_flight += 1
+        # Timed only once admitted: rejections show up in POOL_TASKS, not as fast plan_pool spans
+        with span("plan_pool"):
+            try:
+                pending = self.pool.apply_async(_plan_task, (data, rng, planner),
+                                                callback=self._finished, error_callback=self._finished)
+            except Exception:
+                self._finished(None)
+                raise
+            try:
+                result, events = pending.get(self.timeout)
+            except multiprocessing.TimeoutError:
+                POOL_TASKS.inc(outcome="timeout")
+                raise PoolTimeout()
+            except Exception:
+                POOL_TASKS.inc(outcome="error")
+                raise
+        POOL_TASKS.inc(outcome="ok")
+        replay(events)
+        return result
+
+    def stats(self):
+        return {"processes": self.processes, "in_flight": self.in_flight, "capacity": self.capacity,
+                "timeout": self.timeout}
+
+    def close(self):
+        """Stop the children and remove the shared copies; later calls do nothing."""
+        self._finalizer()
+
+
+def _close_pool(pool, shared_dir):
+    # Not a method: the finalizer must not keep the PlanPool alive
+    if pool is not None:
+        pool.terminate()
+    if shared_dir:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+def start_pool(index, model, processes=POOL_PROCESSES):
+    """PlanPool for this worker, or None when disabled (or when called inside a pool child)."""
+    if processes <= 0 or in_pool_child():
+        return None
+    pool = PlanPool(processes, index, model)
+    print(f"✅ Plan pool started ({processes} processes, timeout {pool.timeout:g}s, capacity {pool.capacity}).")
+    return pool
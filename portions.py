@@ -0,0 +1,98 @@
+import os
+import numpy as np
+
+# ----------------------------------------------------------------------
+# PORTION ENGINE
+# ----------------------------------------------------------------------
+# Serving multipliers for every meal of a plan in one array pass:
+#   multiplier = target kcal / kcal per serving, rounded to PORTION_STEP
+#   servings (or to GRAM_STEP grams when the serving weight is known),
+#   clamped to [MIN_SERVINGS, MAX_SERVINGS]
+# Curated and dataset foods go through the same rule, and the plan totals
+# come out of the same scaled array, so "Actual vs Target" is exact.
+PORTION_STEP = float(os.environ.get("FITFUEL_PORTION_STEP", "0.25"))
+GRAM_STEP = float(os.environ.get("FITFUEL_PORTION_GRAM_STEP", "10"))
+MIN_SERVINGS = 0.25
+MAX_SERVINGS = 3.0
+
+# Multiplier -> portion text (other multipliers read "N Servings")
+SERVING_LABELS = {1.0: "1 Serving", 0.75: "Small Portion (0.75)"}
+
+
+def portion_grid(low=MIN_SERVINGS, high=MAX_SERVINGS, step=PORTION_STEP):
+    """Every multiplier the engine can produce between low and high."""
+    first = np.ceil(low / step - 1e-9) * step
+    return np.round(np.arange(first, high + step / 2, step), 6)
+
+
+def gram_servings(servings, grams, gram_step=GRAM_STEP):
+    """
+    `servings` rounded to whole gram_step grams (at least one step) where the
+    serving weight `grams` is known (> 0); left as is where it is NaN/0.
+    """
+    servings = np.asarray(servings, dtype=np.float64)
+    grams = np.broadcast_to(np.asarray(grams, dtype=np.float64), servings.shape)
+    weighed = grams > 0  # False for NaN
+    if not weighed.any():
+        return servings
+    weight = np.where(weighed, grams, 1.0)
+    by_weight = np.maximum(np.rint(servings * weight / gram_step), 1) * gram_step / weight
+    return np.where(weighed, by_weight, servings)
+
+
+def fit_servings(kcal, targets, grams=None, step=PORTION_STEP, gram_step=GRAM_STEP,
+                 low=MIN_SERVINGS, high=MAX_SERVINGS):
+    """
+    Serving multiplier per item that brings `kcal` (per serving) closest to
+    `targets`. `grams` is the serving weight per item (NaN when unknown);
+    items with one are rounded to whole gram_step grams instead of step
+    servings.
+    """
+    kcal = np.asarray(kcal, dtype=np.float64)
+    exact = np.asarray(targets, dtype=np.float64) / np.maximum(kcal, 1.0)
+    servings = np.rint(exact / step) * step
+    if grams is not None:
+        weighed = np.asarray(grams, dtype=np.float64) > 0
+        if weighed.any():
+            servings = np.where(weighed, gram_servings(exact, grams, gram_step), servings)
+    # np.minimum/np.maximum: np.clip costs more than the rest for a day's 4 meals
+    return np.minimum(np.maximum(servings, low), high)
+
+
+def scale_servings(per_serving, multipliers):
+    """(n, 4) per-serving [kcal, p, c, f] rows -> whole-number rows at `multipliers`."""
+    per_serving = np.asarray(per_serving, dtype=np.float64).reshape(-1, 4)
+    return np.rint(per_serving * np.asarray(multipliers, dtype=np.float64)[:, None]).astype(np.int64)
+
+
+def portion_label(multiplier, grams=None):
+    """Display text for a serving multiplier (grams when the serving weight is known)."""
+    if grams is not None and grams > 0 and grams != float("inf"):
+        return f"{round(multiplier * grams):g} g"
+    multiplier = round(float(multiplier), 6)
+    return SERVING_LABELS.get(multiplier, f"{multiplier:g} Servings")
+
+
+def portion_items(names, per_serving, targets, grams=None):
+    """(plan items, scaled [kcal, p, c, f] rows): one item per name, portioned towards its target kcal."""
+    per_serving = np.asarray(per_serving, dtype=np.float64).reshape(-1, 4)
+    multipliers = fit_servings(per_serving[:, 0], targets, grams)
+    values = np.rint(per_serving * multipliers[:, None]).astype(np.int64)
+    weights = [None] * len(names) if grams is None else np.asarray(grams, dtype=np.float64).tolist()
+    return [{
+        "name": name,
+        "calories": kcal,
+        "protein": p,
+        "carbs": c,
+        "fats": f,
+        "portion": portion_label(m, g),
+    } for name, (kcal, p, c, f), m, g in zip(names, values.tolist(), multipliers.tolist(), weights)], values
+
+
+def totals_against(values, target_calories, macros):
+    """Actual vs target calories/macros from scaled [kcal, p, c, f] rows."""
+    kcal, p, c, f = np.asarray(values, dtype=np.int64).reshape(-1, 4).sum(axis=0).tolist()
+    return {
+        "target": {"calories": int(target_calories), **macros},
+        "actual": {"calories": kcal, "protein_g": p, "carbs_g": c, "fat_g": f},
+    }
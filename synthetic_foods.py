@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# SYNTHETIC FOOD DATASET
+# ----------------------------------------------------------------------
+# Stand-in for the Hugging Face foods dataset so benchmarks and load tests
+# run offline: the app serves one via FITFUEL_FOOD_DATASET=synthetic:...
+# (utils.py), and benchmarks/ builds its indexes from it. Rows use raw
+# column names, so they go through normalize_food_dataframe() exactly like
+# the real dataset; each variant in COLUMN_VARIANTS spells the columns
+# differently to exercise its renaming rules.
+BASE_FOODS = [
+    "rice", "dal", "paneer", "tofu", "oats", "quinoa", "chickpea", "lentil",
+    "spinach", "broccoli", "potato", "banana", "apple", "almond", "peanut",
+    "bread", "pasta", "noodle", "chicken", "egg", "fish", "mutton", "salmon",
+    "milk", "cheese", "yogurt", "butter", "cream",
+]
+STYLES = ["curry", "salad", "soup", "bowl", "wrap", "stir fry", "roast", "toast", "shake", "pulao"]
+NON_VEG_FOODS = {"chicken", "egg", "fish", "mutton", "salmon"}
+
+# Variant -> raw header for name / calories / protein / carbs / fat (None: column missing)
+COLUMN_VARIANTS = {
+    "hf":       ("Name", "Calories", "Protein", "Carbohydrates", "Fat"),
+    "usda":     ("Shrt_Desc", "Calories", "Protein_(g)", "Carbohydrt_(g)", "Total_Fat_(g)"),
+    "messy":    (" Food_Name ", "  CALORIES", "protein (g)", "total carbs (g)", "fat (g)"),
+    "unnamed":  ("Dish", "calories", "Protein", None, None),
+}
+
+
+def synthetic_food_frame(rows, seed=0, variant="hf"):
+    """
+    Raw (un-normalized) food dataframe with `rows` rows. Besides its column
+    names, "usda" adds a saturated fat column (must not become `f`), "messy"
+    stores calories as text with some unparseable cells plus an is_veg
+    label, and "unnamed" has no known name column and no carbs/fat.
+    """
+    name_col, kcal_col, p_col, c_col, f_col = COLUMN_VARIANTS[variant]
+    rng = np.random.default_rng(seed)
+    base = rng.integers(len(BASE_FOODS), size=rows)
+    style = rng.integers(len(STYLES), size=rows)
+    names = [f"{BASE_FOODS[b]} {STYLES[s]} {i}" for i, (b, s) in enumerate(zip(base, style))]
+
+    calories = rng.gamma(2.0, 150.0, size=rows).round(1)
+    # Split calories into macros with a random share each (4/4/9 kcal per g)
+    share = rng.dirichlet([2.0, 3.0, 2.0], size=rows)
+    fat = (calories * share[:, 2] / 9).round(1)
+    columns = {
+        name_col: names,
+        kcal_col: calories,
+        p_col: (calories * share[:, 0] / 4).round(1),
+        c_col: (calories * share[:, 1] / 4).round(1),
+        f_col: fat,
+    }
+    columns.pop(None, None)
+    df = pd.DataFrame(columns)
+
+    if variant == "usda":
+        df["Saturated_Fat_(g)"] = (fat * 0.4).round(1)
+    elif variant == "messy":
+        text = df[kcal_col].astype(str)
+        text[rng.random(rows) < 0.01] = "n/a"
+        df[kcal_col] = text
+        df["is_veg"] = [0 if BASE_FOODS[b] in NON_VEG_FOODS else 1 for b in base]
+    return df
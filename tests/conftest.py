@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+import tempfile
+import pytest
+
+# Flat root modules (utils.py, diet_tags.py, ...) import as top-level names
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests that import app stay offline: synthetic foods, and no local snapshot
+# or catalog to shadow them
+_NOWHERE = os.path.join(tempfile.gettempdir(), "fitfuel-tests-missing")
+os.environ.setdefault("FITFUEL_FOOD_DATASET", "synthetic:2000")
+os.environ.setdefault("FITFUEL_FOOD_SNAPSHOT", os.path.join(_NOWHERE, "food_snapshot"))
+os.environ.setdefault("FITFUEL_CATALOG_URL", "sqlite:///" + os.path.join(_NOWHERE, "catalog.sqlite"))
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    """The app module once its warm-up has finished."""
+    import app
+    deadline = time.monotonic() + 120
+    while not app.WARMUP.ready:
+        assert time.monotonic() < deadline, app.WARMUP.report()
+        time.sleep(0.05)
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def profile():
+    return {"age": "30", "gender": "Male", "height": "175", "weight": "70",
+            "activity": "Sedentary", "goal": "Fat Loss", "diet": "Veg"}
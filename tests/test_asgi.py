@@ -0,0 +1,98 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+import pytest
+
+
+@pytest.fixture
+def asgi(app_module):
+    import asgi
+    return asgi
+
+
+def call(asgi, method, path, body=b"", headers=(), chunks=None):
+    """Run one HTTP request through the ASGI app: (status, headers dict, body)."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": list(headers),
+             "http_version": "1.1", "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 1)}
+    parts = chunks if chunks is not None else [body]
+    messages = [{"type": "http.request", "body": part, "more_body": i < len(parts) - 1}
+                for i, part in enumerate(parts)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start = sent[0]
+    return (start["status"], {k.decode(): v.decode() for k, v in start["headers"]},
+            b"".join(m.get("body", b"") for m in sent[1:]))
+
+
+def form(profile):
+    return urlencode(profile).encode(), [(b"content-type", b"application/x-www-form-urlencoded")]
+
+
+def test_index_is_served_from_memory_with_etag(asgi, app_module):
+    status, headers, body = call(asgi, "GET", "/")
+    assert status == 200 and body == app_module.INDEX_HTML
+    etag = headers["etag"].encode()
+    assert call(asgi, "GET", "/", headers=[(b"if-none-match", etag)])[0] == 304
+    assert call(asgi, "HEAD", "/")[2] == b""
+
+
+def test_predict_goes_through_the_wsgi_bridge(asgi, profile):
+    body, headers = form(profile)
+    status, response_headers, html = call(asgi, "POST", "/predict", body, headers)
+    assert status == 200 and response_headers["content-type"].startswith("text/html")
+    assert b"Breakfast" in html
+
+
+def test_request_body_arrives_in_chunks(asgi, profile):
+    payload = json.dumps({"profiles": [profile, dict(profile, age="5")]}).encode()
+    status, _, body = call(asgi, "POST", "/api/predict/batch", headers=[(b"content-type", b"application/json")],
+                           chunks=[payload[:10], payload[10:40], payload[40:]])
+    results = json.loads(body)["results"]
+    assert status == 200 and "plan" in results[0] and results[1]["errors"] == {"age": "Age 10-100"}
+
+
+def test_oversized_body_is_rejected(asgi, monkeypatch, profile):
+    monkeypatch.setattr(asgi, "MAX_BODY", 16)
+    body, headers = form(profile)
+    assert call(asgi, "POST", "/predict", body, headers)[0] == 413
+
+
+def test_streamed_days_arrive_as_ndjson(asgi, profile):
+    body, headers = form(dict(profile, days="3"))
+    status, _, stream = call(asgi, "POST", "/api/plan/days", body, headers)
+    lines = [json.loads(line) for line in stream.splitlines()]
+    assert status == 200 and [line.get("day") for line in lines[1:]] == [1, 2, 3]
+
+
+def test_unknown_paths_fall_through_to_flask(asgi):
+    assert call(asgi, "GET", "/no-such-page")[0] == 404
+    assert call(asgi, "GET", "/static/not-a-built-asset.css")[0] == 404
+
+
+def test_lifespan_starts_warmup_and_shuts_down(asgi, monkeypatch):
+    executor = ThreadPoolExecutor(1)
+    monkeypatch.setattr(asgi, "EXECUTOR", executor)
+    closed = []
+    monkeypatch.setattr(asgi, "close_plan_pool", lambda: closed.append(True))
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(asgi.app({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert closed == [True]
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from batch import calculate_macros_batch, calculate_tdee_batch, predict_batch
+from food_index import FoodIndex
+from utils import MEAL_WEIGHTS, calculate_macros, calculate_tdee
+
+
+def profile(**overrides):
+    data = {"age": "30", "gender": "Male", "height": "175", "weight": "70",
+            "activity": "Sedentary", "goal": "Fat Loss", "diet": "Veg"}
+    data.update(overrides)
+    return data
+
+
+@pytest.fixture
+def index():
+    return FoodIndex.from_dataframe(pd.DataFrame({
+        "food": ["tofu bowl", "lentil soup", "oats", "chicken curry"],
+        "calories": [300.0, 200.0, 150.0, 450.0],
+        "p": [20.0, 12.0, 5.0, 40.0], "c": [30.0, 30.0, 27.0, 10.0], "f": [10.0, 3.0, 3.0, 25.0],
+    }))
+
+
+def test_vectorized_targets_match_the_scalar_functions():
+    rng = np.random.default_rng(0)
+    n = 200
+    weight, height, age = rng.uniform(40, 150, n), rng.uniform(140, 210, n), rng.integers(15, 90, n).astype(float)
+    genders = rng.choice(["Male", "Female"], n)
+    activities = rng.choice(["Sedentary", "Lightly Active", "Moderately Active", "Very Active"], n)
+    goals = rng.choice(["fat loss", "muscle gain", "maintenance"], n)
+
+    tdee = calculate_tdee_batch(weight, height, age, genders, activities, goals)
+    protein, carbs, fat = calculate_macros_batch(tdee, goals)
+    for i in range(n):
+        assert tdee[i] == calculate_tdee(weight[i], height[i], age[i], genders[i], activities[i], goals[i])
+        assert [protein[i], carbs[i], fat[i]] == list(calculate_macros(int(tdee[i]), goal=goals[i]).values())
+
+
+def test_invalid_profiles_get_error_rows_in_place(index):
+    results = predict_batch([profile(), profile(age="5"), "not a dict", profile(weight="heavy"), profile()],
+                            index=index, rng=np.random.default_rng(0))
+    assert ["errors" in r for r in results] == [False, True, True, True, False]
+    assert results[1]["errors"] == {"age": "Age 10-100"}
+    assert results[3]["errors"] == {"weight": "Invalid weight"}
+    assert "age" in results[2]["errors"]
+
+
+def test_valid_profiles_get_a_full_plan(index):
+    results = predict_batch([profile(), profile(diet="Non-Veg", goal="Muscle Gain")],
+                            index=index, rng=np.random.default_rng(0))
+    for result in results:
+        assert result["tdee"] == calculate_tdee(70.0, 175.0, 30.0, "Male", "Sedentary",
+                                                result["user_data"]["goal"].lower())
+        assert set(result["plan"]) == set(MEAL_WEIGHTS)
+        assert all(len(items) == 1 for items in result["plan"].values())
+        assert result["prediction"] is None
+
+
+def test_all_invalid_or_empty_batches():
+    assert predict_batch([]) == []
+    assert predict_batch([profile(height="1")], index=FoodIndex.empty()) == [{"errors": {"height": "Height realistic"}}]
@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from benchmarks.loadtest import run_load
+from benchmarks.run import compare, measure
+
+
+def test_measure_reports_percentiles_and_runs_warmup_first():
+    calls = []
+    result = measure(lambda: calls.append(1), 40, warmup=3)
+    # warm-up + timed pass + the shorter tracemalloc pass
+    assert len(calls) == 3 + 40 + 2
+    assert result["iterations"] == 40
+    assert 0 <= result["p50_us"] <= result["p90_us"] <= result["p99_us"]
+    assert result["ops_per_sec"] > 0 and result["peak_kib"] >= 0
+
+
+def write_baseline(tmp_path, results):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"meta": {}, "results": results}))
+    return str(path)
+
+
+def test_compare_flags_only_slowdowns_over_threshold(tmp_path, capsys):
+    baseline = write_baseline(tmp_path, {
+        "fast": {"p50_us": 100.0}, "slow": {"p50_us": 100.0}, "zero": {"p50_us": 0.0},
+    })
+    current = {
+        "fast": {"p50_us": 110.0},   # +10%: within 15%
+        "slow": {"p50_us": 130.0},   # +30%
+        "zero": {"p50_us": 5.0},     # no usable baseline
+        "new": {"p50_us": 50.0},     # not in the baseline
+    }
+    regressions = compare(current, baseline, 0.15)
+    assert [(name, before, now) for name, before, now, _ in regressions] == [("slow", 100.0, 130.0)]
+    assert "REGRESSION slow" in capsys.readouterr().out
+
+
+def test_compare_without_regressions(tmp_path, capsys):
+    baseline = write_baseline(tmp_path, {"case": {"p50_us": 100.0}})
+    assert compare({"case": {"p50_us": 80.0}}, baseline, 0.15) == []
+    assert "No p50 regressions" in capsys.readouterr().out
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(0.05)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sent_rate_counts_requests_as_they_go_out(slow_server):
+    # One sender and 50 ms responses: at most ~20 rps can go out, whatever the target
+    summary, _ = run_load(slow_server, [b"a=1"], rps=100, duration=0.2, concurrency=1, interval=10)
+    assert summary["requests"] == 20 and summary["statuses"] == {"200": 20}
+    assert summary["sent_rps"] < 25 and summary["target_rps"] == 100
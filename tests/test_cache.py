@@ -0,0 +1,149 @@
+import sys
+import json
+import types
+import pytest
+import cache
+from cache import CacheBackend, MemoryCache, RedisCache, make_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_memory_cache_expires_after_ttl(clock):
+    c = MemoryCache(maxsize=4, ttl=10)
+    c.set("a", b"1")
+    clock.now += 9.9
+    assert c.get("a") == b"1"
+    clock.now += 0.2
+    assert c.get("a") is None
+    stats = c.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_memory_cache_evicts_least_recently_used(clock):
+    c = MemoryCache(maxsize=2, ttl=60)
+    c.set("a", b"1")
+    c.set("b", b"2")
+    assert c.get("a") == b"1"  # b is now the oldest
+    c.set("c", b"3")
+    assert c.get("b") is None
+    assert c.get("a") == b"1" and c.get("c") == b"3"
+    assert c.stats()["evictions"] == 1
+
+
+def test_memory_cache_set_refreshes_ttl_and_recency(clock):
+    c = MemoryCache(maxsize=2, ttl=10)
+    c.set("a", b"1")
+    c.set("b", b"2")
+    clock.now += 8
+    c.set("a", b"1!")
+    c.set("c", b"3")
+    clock.now += 8
+    assert c.get("a") == b"1!"
+    assert c.get("b") is None
+
+
+def test_backends_must_implement_get_and_set():
+    class Partial(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+class FakeRedisError(Exception):
+    pass
+
+
+class FakeRedis:
+    """Just enough of a redis client; `down` makes every call fail."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise FakeRedisError("connection refused")
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def set(self, key, value, px=None):
+        self._check()
+        self.data[key] = value
+        self.ttls[key] = px
+
+    def info(self, section):
+        self._check()
+        return {"evicted_keys": 3}
+
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    client = FakeRedis()
+    fake = types.SimpleNamespace(RedisError=FakeRedisError,
+                                 Redis=types.SimpleNamespace(from_url=lambda url, **kwargs: client))
+    monkeypatch.setitem(sys.modules, "redis", fake)
+    return make_cache("redis://localhost:6379/0"), client
+
+
+def test_redis_cache_stores_bytes_with_millisecond_ttl(redis_cache):
+    c, client = redis_cache
+    assert isinstance(c, RedisCache)
+    c.ttl = 0.25
+    c.set("k", bytearray(b"v"))
+    assert client.data["k"] == b"v" and client.ttls["k"] == 250
+    c.ttl = 0.0001
+    c.set("k", b"v")
+    assert client.ttls["k"] == 1
+    assert c.get("k") == b"v" and c.get("missing") is None
+    assert c.stats()["evictions"] == 3
+
+
+def test_redis_cache_fails_open(redis_cache):
+    c, client = redis_cache
+    client.down = True
+    c.set("k", b"v")
+    assert c.get("k") is None
+    stats = c.stats()
+    assert (stats["errors"], stats["misses"], stats["hits"]) == (2, 1, 0)
+
+
+def test_unknown_or_unreachable_backends_fall_back_to_memory(monkeypatch):
+    monkeypatch.setitem(sys.modules, "redis", None)
+    assert isinstance(make_cache("redis://localhost:6379/0"), MemoryCache)
+    assert isinstance(make_cache("memory://"), MemoryCache)
+
+
+def test_deterministic_plans_cache_the_plan_not_the_page(app_module, client, profile, monkeypatch):
+    monkeypatch.setattr(app_module, "DETERMINISTIC_PLANS", True)
+    monkeypatch.setattr(app_module, "PLAN_CACHE", MemoryCache())
+    first = client.post("/predict", data=profile).get_data(as_text=True)
+
+    data, _ = app_module.validate_inputs(profile)
+    key = app_module.profile_key(data)
+    cached = json.loads(app_module.PLAN_CACHE.get(key))
+    assert set(cached) >= {"tdee", "macros", "plan", "totals"}
+
+    # A new build's asset URLs show up in cached plans straight away
+    monkeypatch.setattr(app_module, "LAYOUT_HEAD", app_module.LAYOUT_HEAD + "<!-- new build -->")
+    second = client.post("/predict", data=profile).get_data(as_text=True)
+    assert "<!-- new build -->" in second
+    assert second.replace("<!-- new build -->", "") == first
+    assert app_module.PLAN_CACHE.stats()["hits"] == 2
@@ -0,0 +1,93 @@
+import json
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+from calorie_model import FEATURES, CalorieModel, FlatForest, load_flat_model, read_flat_meta, write_flat_model
+
+
+def training_data(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(0, 2, n), rng.uniform(15, 80, n), rng.uniform(140, 210, n),
+        rng.uniform(40, 130, n), rng.uniform(1, 30, n), rng.uniform(67, 128, n),
+    ])
+    y = X[:, 4] * (X[:, 5] - 60) * 0.08 + X[:, 3] * 0.2 + rng.normal(0, 3, n)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = training_data()
+    return RandomForestRegressor(n_estimators=15, max_depth=9, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return training_data(200, seed=1)[0]
+
+
+def test_flat_forest_matches_sklearn(forest, rows):
+    flat = FlatForest.from_estimator(forest)
+    np.testing.assert_allclose(flat.predict(rows), forest.predict(rows), rtol=0, atol=1e-9)
+    for row in rows[:20]:
+        np.testing.assert_allclose(flat.predict(row[None, :]), forest.predict(row[None, :]), rtol=0, atol=1e-9)
+
+
+def test_flat_single_tree_matches_sklearn(rows):
+    X, y = training_data()
+    tree = DecisionTreeRegressor(max_depth=6, random_state=0).fit(X, y)
+    np.testing.assert_allclose(FlatForest.from_estimator(tree).predict(rows), tree.predict(rows), atol=1e-9)
+
+
+def test_compact_forest_stays_within_quantization_error(forest, rows):
+    expected = forest.predict(rows)
+    np.testing.assert_allclose(FlatForest.from_estimator(forest).compact(value_bits=0).predict(rows),
+                               expected, rtol=1e-5)
+    compact = FlatForest.from_estimator(forest).compact(value_bits=16)
+    assert compact.value.dtype == np.uint16
+    assert np.abs(compact.predict(rows) - expected).max() <= compact.scale
+
+
+def test_depth_cap_makes_a_smaller_model_that_still_predicts(forest, rows):
+    full, capped = FlatForest.from_estimator(forest), FlatForest.from_estimator(forest, max_depth=4)
+    assert capped.depth == 4 and capped.nbytes < full.nbytes
+    assert np.isfinite(capped.predict(rows)).all()
+
+
+def test_calorie_model_backends_agree(forest):
+    fast, slow = CalorieModel(forest), CalorieModel(forest, backend="sklearn")
+    assert fast.fast is not None and slow.fast is None
+    args = ([70.0, 55.0], [175.0, 160.0], [30.0, 45.0], ["Male", "female"], ["Sedentary", "Very Active"])
+    np.testing.assert_allclose(fast.predict_profiles(*args), slow.predict_profiles(*args), atol=1e-9)
+    single = fast.predict_profiles(70.0, 175.0, 30.0, "Male", "Sedentary")
+    np.testing.assert_allclose(single, slow.predict_profiles(*args)[:1], atol=1e-9)
+
+
+def test_compact_artifact_round_trip(forest, rows, tmp_path):
+    path = str(tmp_path / "calorie_model.flat")
+    compact = FlatForest.from_estimator(forest).compact()
+    write_flat_model(compact, path, source_digest="abc")
+    model = load_flat_model(path)
+    assert model.estimator is None and model.features == FEATURES
+    assert read_flat_meta(path)["source_digest"] == "abc"
+    np.testing.assert_array_equal(model.predict(rows), compact.predict(rows))
+
+    # Republishing swaps the link; the old version is kept for open readers, older ones pruned
+    write_flat_model(compact, path)
+    write_flat_model(compact, path)
+    assert os.path.islink(path)
+    assert len([p for p in os.listdir(tmp_path) if p.startswith("calorie_model.flat.v")]) == 2
+
+
+def test_unknown_artifact_version_is_rejected(forest, tmp_path):
+    path = str(tmp_path / "calorie_model.flat")
+    write_flat_model(FlatForest.from_estimator(forest).compact(), path)
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path) as fh:
+        meta = json.load(fh)
+    with open(meta_path, "w") as fh:
+        json.dump(dict(meta, version=99), fh)
+    with pytest.raises(ValueError, match="unsupported compact model version"):
+        load_flat_model(path)
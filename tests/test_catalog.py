@@ -0,0 +1,106 @@
+import pytest
+import catalog
+from catalog import CatalogBackend, MemoryCatalog, SQLiteCatalog, write_catalog
+from diet_tags import diet_flags
+
+
+def food(name, calories, meal=None, source="dataset", grams=None):
+    return {"name": name, "source": source, "meal": meal, "calories": calories, "protein": 10.0,
+            "carbs": 20.0, "fats": 5.0, "grams": grams, "diet_flags": int(diet_flags([name])[0])}
+
+
+FOODS = [
+    food("Paneer Butter Masala", 450, meal="Dinner", source="curated", grams=250),
+    food("Poha", 300, meal="Breakfast", source="curated"),
+    food("Chicken Curry", 500),
+    food("Chickpea Salad", 320),
+    food("Peanut Butter Toast", 380),
+    food("Butter Chicken", 520),
+    food("Tofu Stir Fry", 350),
+    food("Crème Brûlée", 400),
+]
+
+
+def names(foods):
+    return [f["name"] for f in foods]
+
+
+@pytest.fixture(params=["fts", "like"])
+def sqlite_catalog(request, tmp_path, monkeypatch):
+    if request.param == "like":
+        # What an SQLite build without FTS5 does
+        monkeypatch.setattr(catalog, "FTS_SCHEMA", "CREATE VIRTUAL TABLE foods_fts USING no_such_module(name)")
+    path = str(tmp_path / "food_catalog.sqlite")
+    assert write_catalog(FOODS, path) == len(FOODS)
+    return SQLiteCatalog(path)
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def any_catalog(request, sqlite_catalog):
+    if request.param == "memory":
+        return MemoryCatalog([dict(f, id=i + 1) for i, f in enumerate(FOODS)])
+    return sqlite_catalog
+
+
+def test_search_matches_word_prefixes_in_import_order(any_catalog):
+    assert names(any_catalog.search("chick")) == ["Chicken Curry", "Chickpea Salad", "Butter Chicken"]
+    assert names(any_catalog.search("butter chi")) == ["Butter Chicken"]
+    assert names(any_catalog.search("utter")) == []
+    assert any_catalog.search("  ") == []
+
+
+def test_search_filters_diet_meal_and_limit(any_catalog):
+    assert names(any_catalog.search("chick", diet="Veg")) == ["Chickpea Salad"]
+    assert names(any_catalog.search("butter", diet="Vegan")) == ["Peanut Butter Toast"]
+    assert names(any_catalog.search("paneer", meal="Breakfast")) == []
+    assert names(any_catalog.search("paneer", meal="Dinner")) == ["Paneer Butter Masala"]
+    assert len(any_catalog.search("chick", limit=2)) == 2
+
+
+def test_search_ignores_case_and_accents(sqlite_catalog):
+    assert names(sqlite_catalog.search("CHICKPEA")) == ["Chickpea Salad"]
+    if sqlite_catalog._connection()[1]:  # the LIKE fallback has no accent folding
+        assert names(sqlite_catalog.search("creme brulee")) == ["Crème Brûlée"]
+
+
+def test_near_orders_by_calorie_distance(any_catalog):
+    assert names(any_catalog.near(330, limit=3)) == ["Chickpea Salad", "Tofu Stir Fry", "Poha"]
+    assert names(any_catalog.near(510, diet="Veg", limit=2)) == ["Paneer Butter Masala", "Crème Brûlée"]
+    # Foods without a meal slot fit any meal; curated ones only their own
+    assert names(any_catalog.near(300, meal="Breakfast", limit=1)) == ["Poha"]
+    assert names(any_catalog.near(300, meal="Dinner", limit=2)) == ["Chickpea Salad", "Tofu Stir Fry"]
+
+
+def test_search_sees_a_reimported_catalog(sqlite_catalog):
+    assert sqlite_catalog.search("lentil") == []
+    write_catalog(FOODS + [food("Lentil Soup", 200)], sqlite_catalog.path)
+    assert names(sqlite_catalog.search("lentil")) == ["Lentil Soup"]
+
+
+def test_unsupported_catalog_version_is_refused(tmp_path, monkeypatch):
+    path = str(tmp_path / "food_catalog.sqlite")
+    monkeypatch.setattr(catalog, "CATALOG_VERSION", 99)
+    write_catalog(FOODS, path)
+    monkeypatch.setattr(catalog, "CATALOG_VERSION", 1)
+    with pytest.raises(ValueError, match="unsupported catalog version"):
+        SQLiteCatalog(path)
+    assert isinstance(catalog.make_catalog("sqlite:///" + path), MemoryCatalog)
+
+
+def test_backends_must_implement_search_and_near():
+    class SearchOnly(CatalogBackend):
+        def search(self, query, diet=None, meal=None, limit=10):
+            return []
+
+    with pytest.raises(TypeError):
+        SearchOnly()
+
+
+def test_search_endpoint_portions_results_to_kcal(app_module, client, sqlite_catalog, monkeypatch):
+    monkeypatch.setattr(app_module, "CATALOG", sqlite_catalog)
+    results = client.get("/foods/search?q=paneer&kcal=900&meal=Dinner").get_json()["results"]
+    assert names(results) == ["Paneer Butter Masala"]
+    assert results[0]["item"]["portion"] == "500 g" and results[0]["item"]["calories"] == 900
+    assert names(client.get("/foods/search?kcal=300&limit=1").get_json()["results"]) == ["Poha"]
+    errors = client.get("/foods/search?limit=500").get_json()["errors"]
+    assert set(errors) == {"limit", "q"}
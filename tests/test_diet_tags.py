@@ -0,0 +1,81 @@
+import pytest
+from diet_tags import DAIRY, EGG, FISH, MEAT, VEG, VEGAN, diet_flags
+
+
+def tags(name):
+    return int(diet_flags([name])[0])
+
+
+@pytest.mark.parametrize("name", [
+    "Catfish", "Swordfish", "Shellfish", "Codfish", "Fishcake", "Scallops", "Anchovies",
+])
+def test_fish_compounds_and_plurals_are_not_veg(name):
+    flags = tags(name)
+    assert flags & FISH
+    assert not flags & (VEG | VEGAN)
+
+
+@pytest.mark.parametrize("name", ["Porkchop", "Meatloaf", "Hot dog"])
+def test_meat_compounds_are_not_veg(name):
+    flags = tags(name)
+    assert flags & MEAT
+    assert not flags & (VEG | VEGAN)
+
+
+@pytest.mark.parametrize("name", ["Cheesecake", "Milkshake", "Buttercream", "Gelato", "Lasagna"])
+def test_dairy_dishes_are_veg_not_vegan(name):
+    flags = tags(name)
+    assert flags & DAIRY
+    assert flags & VEG and not flags & VEGAN
+
+
+@pytest.mark.parametrize("name", ["Eggnog", "Tiramisu"])
+def test_egg_dishes_are_not_veg(name):
+    flags = tags(name)
+    assert flags & EGG
+    assert not flags & (VEG | VEGAN)
+
+
+@pytest.mark.parametrize("name", ["Goat cheese", "Goat's cheese salad"])
+def test_goat_cheese_is_dairy_not_meat(name):
+    flags = tags(name)
+    assert flags & DAIRY and not flags & MEAT
+    assert flags & VEG
+
+
+@pytest.mark.parametrize("name", [
+    "Eggplant curry", "Peanut butter toast", "Almond milk", "Masala Oats with Veggies",
+    "Graham crackers", "Collard greens", "Butternut squash soup", "Tofu bean curd",
+])
+def test_plant_exceptions_stay_vegan(name):
+    assert tags(name) & VEGAN
+
+
+def test_flags_follow_input_order_and_blanks():
+    flags = diet_flags(["Chicken curry", None, "Chicken curry", "Dal"]).tolist()
+    assert flags[0] == flags[2] and flags[0] & MEAT
+    assert flags[1] & VEGAN and flags[3] & VEGAN
+
+
+def test_parmigiano_reggiano_is_dairy_not_egg():
+    flags = tags("Parmigiano Reggiano")
+    assert flags & DAIRY and not flags & EGG
+    assert flags & VEG
+
+
+@pytest.mark.parametrize("name, meat", [("Reveal", False), ("Veal cutlet", True), ("Veal", True)])
+def test_veal_is_a_whole_word(name, meat):
+    assert bool(tags(name) & MEAT) == meat
+
+
+@pytest.mark.parametrize("name", [
+    "Dairy-free ice cream", "Ice cream, dairy free", "Non-dairy creamer", "Eggless cake", "Egg-free mayo",
+    "Nuts, coconut meat, raw",
+])
+def test_free_of_markers_clear_their_flag(name):
+    assert tags(name) & VEGAN
+
+
+def test_free_of_one_ingredient_keeps_the_others():
+    flags = tags("Dairy free pancakes with egg")
+    assert flags & EGG and not flags & DAIRY
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from diet_tags import VEG, VEGAN
+from food_index import FoodIndex, diet_key
+
+
+def frame():
+    return pd.DataFrame({
+        "food": ["tofu bowl", "chicken curry", "paneer tikka", "lentil soup", "salmon roast", "oats", "egg toast"],
+        "calories": [300.0, 450.0, 380.0, 200.0, 520.0, 150.0, 250.0],
+        "p": [20.0, 40.0, 18.0, 12.0, 35.0, 5.0, 14.0],
+        "c": [30.0, 10.0, 12.0, 30.0, 0.0, 27.0, 20.0],
+        "f": [10.0, 25.0, 28.0, 3.0, 35.0, 3.0, 12.0],
+    })
+
+
+@pytest.fixture
+def index():
+    return FoodIndex.from_dataframe(frame())
+
+
+@pytest.mark.parametrize("pref, key", [
+    ("Non-Veg", "non-veg"), ("non veg", "non-veg"), ("Vegan", "vegan"), ("Veg", "veg"), ("anything", "veg"),
+])
+def test_diet_key(pref, key):
+    assert diet_key(pref) == key
+
+
+def test_rows_are_sorted_by_calories(index):
+    assert list(index.calories) == sorted(frame()["calories"])
+    assert index.names[0] == "Oats"
+    assert not index.calories.flags.writeable
+
+
+def test_partitions_hold_only_matching_diets(index):
+    names = {key: {index.names[i] for i in index.partitions[key][0]} for key in ("veg", "vegan", "non-veg")}
+    assert names["non-veg"] == set(frame()["food"].str.title())
+    assert names["veg"] == {"Tofu Bowl", "Paneer Tikka", "Lentil Soup", "Oats"}
+    assert names["vegan"] == {"Tofu Bowl", "Lentil Soup", "Oats"}
+    for key in ("veg", "vegan", "non-veg"):
+        rows, cal = index.partitions[key]
+        assert list(cal) == list(index.calories[rows])
+        assert list(cal) == sorted(cal)
+    assert all(index.diet_flags[i] & VEGAN for i in index.partitions["vegan"][0])
+    assert index.size("Veg") == 4
+
+
+def test_mask_matches_partitions(index):
+    assert list(np.flatnonzero(index.mask(require=VEG))) == list(index.partitions["veg"][0])
+
+
+def test_nearest_stays_within_ten_percent_over_target(index):
+    rows = index.nearest("Non-Veg", 400, k=3)
+    assert len(rows) == 3
+    assert {index.names[i] for i in rows} == {"Paneer Tikka", "Tofu Bowl", "Egg Toast"}
+    assert max(index.calories[rows]) <= 440
+
+
+def test_nearest_falls_back_to_all_foods_below_smallest(index):
+    rows = index.nearest("Vegan", 10, k=2)
+    assert {index.names[i] for i in rows} == {"Oats", "Lentil Soup"}
+
+
+def test_nearest_returns_whole_partition_when_k_is_large(index):
+    assert sorted(index.nearest("Vegan", 1000, k=20)) == sorted(index.partitions["vegan"][0])
+
+
+def test_sample_nearest_draws_from_nearest(index):
+    rng = np.random.default_rng(0)
+    targets = np.array([150.0, 300.0, 500.0])
+    for _ in range(20):
+        picks = index.sample_nearest("Veg", targets, rng, k=2)
+        for target, pick in zip(targets, picks):
+            assert pick in index.nearest("Veg", target, k=2)
+
+
+def test_empty_index():
+    index = FoodIndex.empty()
+    assert len(index) == 0
+    assert len(index.nearest("Veg", 300)) == 0
+    assert list(index.sample_nearest("Veg", [300.0], np.random.default_rng(0))) == [-1]
+    assert len(FoodIndex.from_dataframe(pd.DataFrame())) == 0
@@ -0,0 +1,49 @@
+import random
+import pytest
+import utils
+from food_index import FoodIndex
+from meal_optimizer import iter_meal_plans, optimize_meal_plan
+from synthetic_foods import synthetic_food_frame
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FoodIndex.from_dataframe(utils.normalize_food_dataframe(synthetic_food_frame(5000)))
+
+
+@pytest.mark.parametrize("diet", ["Veg", "Non-Veg", "Vegan"])
+def test_plan_lands_near_the_calorie_target(index, diet):
+    macros = utils.calculate_macros(2200, "maintenance")
+    plan, totals = optimize_meal_plan(2200, macros, diet, index=index, rng=random.Random(0))
+    assert set(plan) == set(utils.MEAL_WEIGHTS)
+    assert abs(totals["actual"]["calories"] - 2200) <= 2200 * 0.05
+
+
+def test_same_seed_same_plan(index):
+    macros = utils.calculate_macros(1800, "fat loss")
+    plans = [optimize_meal_plan(1800, macros, "Veg", index=index, rng=random.Random(7))[0] for _ in range(2)]
+    assert plans[0] == plans[1]
+
+
+def test_exhausted_time_budget_still_returns_a_full_plan(index):
+    macros = utils.calculate_macros(2500, "muscle gain")
+    plan, totals = optimize_meal_plan(2500, macros, "Non-Veg", index=index, rng=random.Random(0), time_budget=0)
+    assert set(plan) == set(utils.MEAL_WEIGHTS)
+    assert all(len(items) == 1 for items in plan.values())
+    assert totals["actual"]["calories"] > 0
+
+
+def test_curated_only_without_dataset():
+    macros = utils.calculate_macros(2000, "maintenance")
+    plan, _ = optimize_meal_plan(2000, macros, "Vegan", index=FoodIndex.empty(), rng=random.Random(0))
+    curated = {o["name"] for meals in utils.CURATED_DB["vegan"].values() for o in meals}
+    assert {items[0]["name"] for items in plan.values()} <= curated | {"Healthy Choice"}
+
+
+def test_multi_day_plans_vary_items(index):
+    macros = utils.calculate_macros(2200, "maintenance")
+    days = list(iter_meal_plans(2200, macros, "Veg", days=4, variety_days=3, index=index, rng=random.Random(0)))
+    assert [d["day"] for d in days] == [1, 2, 3, 4]
+    for meal in utils.MEAL_WEIGHTS:
+        names = [d["plan"][meal][0]["name"] for d in days]
+        assert len(set(names[:3])) == 3 and len(set(names[1:])) == 3
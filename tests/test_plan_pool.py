@@ -0,0 +1,73 @@
+import os
+import pytest
+import utils
+import plan_pool
+from food_index import FoodIndex
+from metrics import STAGE_SECONDS
+from plan_pool import POOL_TASKS, PlanPool, PoolSaturated, in_pool_child
+from synthetic_foods import synthetic_food_frame
+
+
+def observations(stage):
+    series = STAGE_SECONDS._series.get((stage,))
+    return sum(series[:-1]) if series else 0
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FoodIndex.from_dataframe(utils.normalize_food_dataframe(synthetic_food_frame(500)))
+
+
+@pytest.fixture(scope="module")
+def pool(index):
+    pool = PlanPool(1, index, None, timeout=60, queue=0)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def data(app_module, profile):
+    return app_module.validate_inputs(profile)[0]
+
+
+def test_run_plans_in_a_child_and_replays_its_spans(pool, data):
+    before = observations("meal_plan"), observations("plan_pool")
+    tdee, macros, meal_plan, totals, prediction = pool.run(data)
+    assert tdee > 0 and set(meal_plan) >= {"Breakfast", "Lunch", "Dinner"}
+    assert observations("meal_plan") == before[0] + 1 and observations("plan_pool") == before[1] + 1
+    assert pool.in_flight == 0
+
+
+def test_only_children_know_they_are_pool_children(pool):
+    assert pool.pool.apply(in_pool_child) is True
+    assert in_pool_child() is False
+    assert plan_pool.start_pool(None, None, processes=0) is None
+
+
+def test_saturated_pool_rejects_without_a_span(pool, data):
+    pool.in_flight = pool.capacity
+    try:
+        rejected, spans = POOL_TASKS.value(outcome="rejected"), observations("plan_pool")
+        with pytest.raises(PoolSaturated):
+            pool.run(data)
+        assert POOL_TASKS.value(outcome="rejected") == rejected + 1
+        assert observations("plan_pool") == spans
+    finally:
+        pool.in_flight = 0
+
+
+def test_close_removes_the_shared_copies(index):
+    pool = PlanPool(1, index, None, queue=0)
+    shared_dir = pool._shared_dir
+    assert os.path.isdir(os.path.join(shared_dir, "food_snapshot"))
+    pool.close()
+    assert not os.path.exists(shared_dir)
+    pool.close()
+
+
+def test_saturated_pool_answers_503(app_module, client, profile, pool, monkeypatch):
+    monkeypatch.setattr(app_module, "POOL_PROCESSES", 1)
+    monkeypatch.setattr(app_module.WARMUP, "get", lambda name: pool if name == "plan_pool" else None)
+    monkeypatch.setattr(pool, "in_flight", pool.capacity)
+    response = client.post("/predict", data=profile)
+    assert response.status_code == 503 and response.headers["Retry-After"] == str(plan_pool.RETRY_AFTER)
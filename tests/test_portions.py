@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from portions import (MAX_SERVINGS, MIN_SERVINGS, fit_servings, gram_servings, portion_grid, portion_items,
+                      portion_label, scale_servings, totals_against)
+
+NAN = float("nan")
+
+
+def test_grid_covers_the_bounds_in_steps():
+    grid = portion_grid()
+    assert grid[0] == MIN_SERVINGS and grid[-1] == MAX_SERVINGS
+    assert np.allclose(np.diff(grid), 0.25)
+    assert portion_grid(0.3, 1.0, 0.25).tolist() == [0.5, 0.75, 1.0]
+
+
+@pytest.mark.parametrize("kcal, target, expected", [
+    (400, 400, 1.0),
+    (400, 500, 1.25),    # exact 1.25
+    (400, 560, 1.5),     # 1.4 -> nearest quarter
+    (400, 540, 1.25),    # 1.35 -> nearest quarter
+    (400, 10, MIN_SERVINGS),
+    (100, 5000, MAX_SERVINGS),
+    (0, 300, MAX_SERVINGS),  # no calories per serving: never divides by zero
+])
+def test_servings_round_to_steps_within_bounds(kcal, target, expected):
+    assert fit_servings([kcal], [target])[0] == expected
+
+
+def test_known_serving_weights_round_to_whole_grams():
+    servings = fit_servings([300, 300], [500, 500], [250, NAN])
+    # 1.667 servings of 250 g = 416.7 g -> 420 g; the unweighed item -> 1.75
+    assert servings[0] * 250 == pytest.approx(420)
+    assert servings[1] == 1.75
+
+
+def test_gram_rounding_keeps_at_least_one_step():
+    assert gram_servings([0.01], [100]) == pytest.approx([0.1])
+    assert gram_servings([1.3], [NAN]) == pytest.approx([1.3])
+    assert gram_servings([1.32, 1.32], [0, 50]).tolist() == pytest.approx([1.32, 1.4])
+
+
+def test_gram_rounding_is_still_clamped():
+    assert fit_servings([10], [5000], [20])[0] == MAX_SERVINGS
+    assert fit_servings([1000], [10], [300])[0] == MIN_SERVINGS
+
+
+@pytest.mark.parametrize("multiplier, grams, label", [
+    (1.0, None, "1 Serving"), (0.75, None, "Small Portion (0.75)"), (1.5, None, "1.5 Servings"),
+    (1.68, 250.0, "420 g"), (2.0, NAN, "2 Servings"), (1.0, 0.0, "1 Serving"),
+])
+def test_labels(multiplier, grams, label):
+    assert portion_label(multiplier, grams) == label
+
+
+def test_items_and_totals_come_from_the_same_scaled_rows():
+    per_serving = [[400, 20, 50, 10], [250, 10, 30, 8]]
+    items, values = portion_items(["Poha", "Dal"], per_serving, [600, 250], [NAN, 200])
+    assert [it["portion"] for it in items] == ["1.5 Servings", "200 g"]
+    assert values.tolist() == scale_servings(per_serving, [1.5, 1.0]).tolist()
+    totals = totals_against(values, 850, {"protein_g": 40.0, "carbs_g": 100.0, "fat_g": 20.0})
+    assert totals["actual"] == {"calories": sum(it["calories"] for it in items), "protein_g": 40,
+                                "carbs_g": 105, "fat_g": 23}
+    assert totals["target"]["calories"] == 850
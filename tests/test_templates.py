@@ -0,0 +1,45 @@
+import random
+import pytest
+from flask import render_template
+
+
+@pytest.fixture
+def result(app_module, profile):
+    data, _ = app_module.validate_inputs(profile)
+    return app_module.build_result(data, rng=random.Random(3))
+
+
+def test_prerendered_page_matches_a_full_render(app_module, result):
+    with app_module.app.test_request_context("/predict", method="POST"):
+        full = render_template("result.html", **result)
+    # Only whitespace around the {% include %} differs
+    assert app_module.render_result(result).split() == full.split()
+
+
+def test_index_page_matches_a_full_render(app_module):
+    with app_module.app.test_request_context("/"):
+        assert app_module.INDEX_HTML == render_template("index.html").encode("utf-8")
+
+
+def test_meal_cards_are_cached_by_content(app_module):
+    app_module._meal_card_html.cache_clear()
+    items = [{"name": "Poha", "calories": 350, "portion": "1 Serving"}]
+    first = app_module.meal_card("Breakfast", items)
+    assert app_module.meal_card("Breakfast", [dict(items[0])]) == first
+    assert app_module._meal_card_html.cache_info().hits == 1
+
+    resized = app_module.meal_card("Breakfast", [dict(items[0], calories=525, portion="1.5 Servings")])
+    assert "525 kcal" in resized and "1.5 Servings" in resized
+    assert app_module._meal_card_html.cache_info().misses == 2
+
+
+def test_cached_meal_cards_escape_names(app_module):
+    html = app_module.meal_card("Lunch", [{"name": "<script>x</script>", "calories": 1, "portion": "1 Serving"}])
+    assert "<script>" not in html and "&lt;script&gt;" in html
+
+
+def test_index_revalidates_with_its_etag(app_module, client):
+    response = client.get("/")
+    assert response.headers["ETag"] == f'"{app_module.INDEX_ETAG}"'
+    assert client.get("/", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert client.get("/", headers={"If-None-Match": '"stale"'}).status_code == 200
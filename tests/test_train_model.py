@@ -0,0 +1,26 @@
+import os
+import stat
+import pytest
+from train_model import load_artifact, save_artifact
+
+
+@pytest.mark.parametrize("umask", [0o022, 0o077])
+def test_saved_artifact_follows_the_umask(tmp_path, umask):
+    path = str(tmp_path / "calorie_model.pkl")
+    previous = os.umask(umask)
+    try:
+        save_artifact({"model": "m", "features": ["Age"]}, path)
+    finally:
+        os.umask(previous)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+    assert load_artifact(path) == {"model": "m", "features": ["Age"]}
+    assert os.listdir(tmp_path) == ["calorie_model.pkl"]
+
+
+def test_failed_save_keeps_the_old_artifact(tmp_path):
+    path = str(tmp_path / "calorie_model.pkl")
+    save_artifact({"model": "old"}, path)
+    with pytest.raises(Exception):
+        save_artifact({"model": lambda: None}, path)  # not picklable
+    assert load_artifact(path) == {"model": "old"}
+    assert os.listdir(tmp_path) == ["calorie_model.pkl"]
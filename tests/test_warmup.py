@@ -0,0 +1,56 @@
+import threading
+import time
+from warmup import FAILED, PENDING, READY, Warmup
+
+
+def wait_ready(warmup, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not warmup.ready:
+        assert time.monotonic() < deadline, warmup.report()
+        time.sleep(0.01)
+
+
+def test_components_are_none_until_loaded():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "model"
+
+    warmup = Warmup({"model": slow})
+    assert warmup.status["model"]["state"] == PENDING
+    warmup.start()
+    assert warmup.get("model") is None and not warmup.ready
+    release.set()
+    wait_ready(warmup)
+    assert warmup.get("model") == "model"
+    assert warmup.report()["components"]["model"]["state"] == READY
+
+
+def test_failed_loader_counts_as_ready_and_keeps_loading_the_rest():
+    def broken():
+        raise RuntimeError("no model")
+
+    warmup = Warmup({"model": broken, "food_index": lambda: "index"})
+    warmup.start()
+    wait_ready(warmup)
+    status = warmup.report()["components"]["model"]
+    assert status["state"] == FAILED and status["error"] == "no model"
+    assert warmup.get("model") is None
+    assert warmup.get("food_index") == "index"
+
+
+def test_loaders_run_in_order_and_may_use_earlier_components():
+    warmup = Warmup({"a": lambda: 1, "b": lambda: warmup.get("a") + 1})
+    warmup.start()
+    wait_ready(warmup)
+    assert warmup.get("b") == 2
+
+
+def test_start_is_idempotent_per_process():
+    calls = []
+    warmup = Warmup({"model": lambda: calls.append(1)})
+    for _ in range(5):
+        warmup.start()
+    wait_ready(warmup)
+    assert calls == [1]
@@ -1,71 +1,269 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
 import joblib
-import os
+from scipy.stats import randint
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import RandomizedSearchCV
+from calorie_model import (FEATURES, GENDER_MAPPING, MODEL_PATH, FLATTENABLE,
+                           FlatForest, artifact_digest, write_flat_model)
+
+# ----------------------------------------------------------------------
+# TRAINING PIPELINE
+# ----------------------------------------------------------------------
+#   python train_model.py                             # full retrain
+#   python train_model.py --incremental --add-trees 20  # grow the live forest
+#   python train_model.py --search 20                 # tune, then retrain
+#   python train_model.py --export-only --max-depth 10  # compact artifact only
+#
+# calories.csv is streamed in chunks with explicit dtypes (float32 is what
+# the trees compare against anyway), every fit/search uses all cores, and
+# the result is written atomically to MODEL_PATH, the file app.py loads.
+# Dataset columns: User_ID, Gender, Age, Height, Weight, Duration, Heart_Rate, Body_Temp, Calories
+CSV_PATH = "calories.csv"
+CHUNK_ROWS = 50_000
+TARGET = "Calories"
+
+CSV_DTYPES = {
+    "Gender": "category",
+    "Age": np.float32,
+    "Height": np.float32,
+    "Weight": np.float32,
+    "Duration": np.float32,
+    "Heart_Rate": np.float32,
+    "Calories": np.float32,
+}
+
+# Every 5th row (by a stable hash of its position) is held out, so rows
+# appended later never move between train and test across retrains.
+HOLDOUT_EVERY = 5
+
+SEARCH_SPACE = {
+    "n_estimators": randint(50, 300),
+    "max_depth": [None, 12, 16, 20, 24],
+    "min_samples_leaf": randint(1, 6),
+    "max_features": [1.0, 0.8, 0.6, "sqrt"],
+}
+
+
+def read_training_data(csv_path=CSV_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    Stream csv_path into (X float32, y float32, row positions, rows read).
+    Gender is encoded with the fixed GENDER_MAPPING so every retrain uses
+    the same codes.
+    """
+    X_parts, y_parts, row_parts = [], [], []
+    rows = 0
+    reader = pd.read_csv(csv_path, usecols=FEATURES + [TARGET], dtype=CSV_DTYPES, chunksize=chunk_rows)
+    for chunk in reader:
+        position = np.arange(rows, rows + len(chunk))
+        rows += len(chunk)
+        gender = chunk["Gender"].astype(str).str.lower().map(GENDER_MAPPING)
+        chunk = chunk.assign(Gender=gender.astype(np.float32))
+        keep = chunk.notna().all(axis=1).to_numpy()
+        X_parts.append(chunk.loc[keep, FEATURES].to_numpy(dtype=np.float32))
+        y_parts.append(chunk.loc[keep, TARGET].to_numpy(dtype=np.float32))
+        row_parts.append(position[keep])
+
+    if not X_parts:
+        return np.zeros((0, len(FEATURES)), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, np.int64), 0
+    return np.concatenate(X_parts), np.concatenate(y_parts), np.concatenate(row_parts), rows
+
+
+def holdout_mask(positions):
+    return (positions * 2654435761 % 2**32) % HOLDOUT_EVERY == 0
+
+
+def search_params(X, y, n_iter, jobs):
+    """RandomizedSearchCV over SEARCH_SPACE; the search itself is parallel across candidates/folds."""
+    search = RandomizedSearchCV(
+        RandomForestRegressor(random_state=42),
+        SEARCH_SPACE,
+        n_iter=n_iter,
+        cv=3,
+        n_jobs=jobs,
+        random_state=42,
+        refit=False,
+    )
+    search.fit(X, y)
+    print(f"   Best CV R^2 {search.best_score_:.4f} with {search.best_params_}")
+    return search.best_params_
+
 
-def train_and_save_model():
-    print("🚀 Starting Model Training Process...")
+def load_artifact(path):
+    if not os.path.exists(path):
+        return None
+    artifact = joblib.load(path)
+    return artifact if isinstance(artifact, dict) else {"model": artifact}
+
+
+def save_artifact(artifact, path):
+    """joblib.dump to a temp file beside `path`, then os.replace: readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".calorie_model-", suffix=".tmp")
+    # mkstemp creates 0600; give the artifact the mode a plain open() would
+    umask = os.umask(0)
+    os.umask(umask)
+    os.fchmod(fd, 0o666 & ~umask)
+    os.close(fd)
+    try:
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def export_compact(artifact, X_eval, y_eval, model_path=MODEL_PATH, max_depth=None, value_bits=16):
+    """
+    Write the mmap-able compact artifact next to model_path (calorie_model.pkl
+    -> calorie_model.flat/) and report its size and accuracy against the
+    full model on the holdout rows.
+    """
+    out_path = os.path.splitext(model_path)[0] + ".flat"
+    model = artifact["model"]
+    if type(model).__name__ not in FLATTENABLE:
+        print(f"❌ {type(model).__name__} cannot be exported as a compact model.")
+        return None
+
+    full = FlatForest.from_estimator(model)
+    compact = FlatForest.from_estimator(model, max_depth=max_depth).compact(value_bits)
+    full_pred = full.predict(X_eval)
+    compact_pred = compact.predict(X_eval)
+    diff = np.abs(compact_pred - full_pred)
+    accuracy = {
+        "rows": int(len(y_eval)),
+        "r2_full": round(float(r2_score(y_eval, full_pred)), 6),
+        "r2_compact": round(float(r2_score(y_eval, compact_pred)), 6),
+        "mae_vs_full": round(float(diff.mean()), 6),
+        "max_abs_vs_full": round(float(diff.max()), 6),
+        "bytes_full": int(full.nbytes),
+        "bytes_compact": int(compact.nbytes),
+    }
+    write_flat_model(
+        compact, out_path,
+        features=artifact.get("features", FEATURES),
+        gender_mapping=artifact.get("gender_mapping", GENDER_MAPPING),
+        model_version=artifact.get("version"),
+        source_digest=artifact_digest(model_path),
+        max_depth=max_depth,
+        value_bits=value_bits,
+        accuracy=accuracy,
+    )
+    print(f"📦 Compact model written to {out_path}: {accuracy['bytes_compact'] / 1024:.0f} KiB "
+          f"(full {accuracy['bytes_full'] / 1024:.0f} KiB), depth {compact.depth}, {value_bits or 32}-bit values")
+    print(f"   R^2 {accuracy['r2_compact']:.4f} (full {accuracy['r2_full']:.4f}); "
+          f"vs full model: mean |diff| {accuracy['mae_vs_full']:.3f} kcal, max {accuracy['max_abs_vs_full']:.3f} kcal")
+    return accuracy
+
+
+def train_and_save_model(csv_path=CSV_PATH, out_path=MODEL_PATH, incremental=False, add_trees=20,
+                         max_trees=300, n_estimators=100, search=0, jobs=-1, chunk_rows=CHUNK_ROWS,
+                         export=False, export_only=False, max_depth=None, value_bits=16):
+    print("🚀 Starting Model Training Process..." if not export_only else "📦 Exporting compact model...")
 
     # 1. Load Data
-    # Ensure calories.csv is in the same folder as this script
-    csv_path = 'calories.csv'
-    
     if not os.path.exists(csv_path):
         print(f"❌ Error: '{csv_path}' not found.")
         print("Please download 'calories.csv' and place it in this folder.")
-        return
-
-    print(f"📂 Loading dataset from {csv_path}...")
-    data = pd.read_csv(csv_path)
-
-    # 2. Preprocessing
-    # Your dataset columns: User_ID, Gender, Age, Height, Weight, Duration, Heart_Rate, Body_Temp, Calories
-    
-    # Check for null values
-    if data.isnull().sum().sum() > 0:
-        print("⚠️  Warning: Missing values found. Dropping missing rows...")
-        data = data.dropna()
-
-    # Encode Gender (Male: 1, Female: 0)
-    # The LabelEncoder will automatically assign 0/1 based on alphabetical order usually (female=0, male=1)
-    print("⚙️  Encoding categorical data...")
-    le = LabelEncoder()
-    data['Gender'] = le.fit_transform(data['Gender'])
-    
-    # Print mapping to be sure (Optional debug info)
-    # 0 = Female, 1 = Male (usually)
-    print(f"   Gender Mapping: {dict(zip(le.classes_, le.transform(le.classes_)))}")
-
-    # Features (X) - We exclude User_ID and Body_Temp (Temp is result of exercise, not input predictor usually)
-    # We include Duration & Heart_Rate because the app will simulate these based on "Activity Level"
-    X = data[['Gender', 'Age', 'Height', 'Weight', 'Duration', 'Heart_Rate']]
-    
-    # Target (y) - Calories burned
-    y = data['Calories']
-
-    # 3. Train Test Split
-    print("✂️  Splitting data into training and testing sets...")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    # 4. Train Model
-    print("🧠 Training Random Forest Regressor (this may take a moment)...")
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
-
-    # Evaluate (Optional)
-    score = model.score(X_test, y_test)
-    print(f"✅ Model Training Complete! R^2 Score: {score:.4f}")
-
-    # 5. Save Model
-    # Create 'models' directory if it doesn't exist
-    if not os.path.exists('models'):
-        os.makedirs('models')
-    
-    save_path = 'models/calorie_model.pkl'
-    joblib.dump(model, save_path)
-    print(f"💾 Model saved successfully to: {save_path}")
+        return None
+
+    print(f"📂 Streaming dataset from {csv_path} ({chunk_rows} rows per chunk)...")
+    start = time.perf_counter()
+    X, y, positions, rows = read_training_data(csv_path, chunk_rows)
+    print(f"   {len(y)} usable rows of {rows} ({time.perf_counter() - start:.2f}s)")
+    if not len(y):
+        print("❌ Error: no usable rows.")
+        return None
+
+    # 2. Train / holdout split (stable across appends)
+    test = holdout_mask(positions)
+    X_train, y_train, X_test, y_test = X[~test], y[~test], X[test], y[test]
+
+    previous = load_artifact(out_path)
+    previous_model = previous.get("model") if previous else None
+
+    if export_only:
+        if previous is None:
+            print(f"❌ Error: no model at {out_path} to export.")
+            return None
+        export_compact(previous, X_test, y_test, out_path, max_depth=max_depth, value_bits=value_bits)
+        return previous
+
+    # 3. Train Model
+    start = time.perf_counter()
+    if incremental and isinstance(previous_model, RandomForestRegressor):
+        if previous.get("rows") == rows:
+            print(f"✅ No new rows since version {previous.get('version')}; nothing to do.")
+            return previous
+        # warm_start only fits the added trees; old ones are kept as they are
+        model = previous_model
+        model.set_params(warm_start=True, n_jobs=jobs, n_estimators=len(model.estimators_) + add_trees)
+        print(f"🌲 Adding {add_trees} trees to the existing {len(model.estimators_)}...")
+        model.fit(X_train, y_train)
+        if len(model.estimators_) > max_trees:
+            # Keep the newest trees so the served forest (and its latency) stays bounded
+            model.estimators_ = model.estimators_[-max_trees:]
+            model.n_estimators = max_trees
+        model.set_params(warm_start=False)
+    else:
+        if incremental:
+            print("⚠️  No existing random forest to extend; training from scratch.")
+        params = {"n_estimators": n_estimators}
+        if search:
+            print(f"🔎 Randomized search over {search} candidates...")
+            params = search_params(X_train, y_train, search, jobs)
+        print("🧠 Training Random Forest Regressor (this may take a moment)...")
+        model = RandomForestRegressor(random_state=42, n_jobs=jobs, **params)
+        model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    # sklearn keeps n_jobs on the estimator; serving predicts one row at a time
+    model.set_params(n_jobs=None)
+
+    score = model.score(X_test, y_test) if len(y_test) else float("nan")
+    print(f"✅ Model Training Complete! R^2 Score: {score:.4f} ({len(model.estimators_)} trees, {fit_s:.1f}s)")
+
+    # 4. Save Model
+    artifact = {
+        "model": model,
+        "features": FEATURES,
+        "gender_mapping": GENDER_MAPPING,
+        "version": (previous or {}).get("version", 0) + 1,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "rows": rows,
+        "r2": round(float(score), 6),
+    }
+    save_artifact(artifact, out_path)
+    print(f"💾 Model v{artifact['version']} saved successfully to: {out_path}")
+    if export:
+        export_compact(artifact, X_test, y_test, out_path, max_depth=max_depth, value_bits=value_bits)
+    return artifact
+
 
 if __name__ == "__main__":
-    train_and_save_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the calorie-burn model.")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--out", default=MODEL_PATH, help="artifact path (the one app.py loads)")
+    parser.add_argument("--trees", type=int, default=100, help="forest size for a full retrain")
+    parser.add_argument("--incremental", action="store_true", help="warm-start: add trees to the current model")
+    parser.add_argument("--add-trees", type=int, default=20)
+    parser.add_argument("--max-trees", type=int, default=300, help="drop the oldest trees past this many")
+    parser.add_argument("--search", type=int, default=0, metavar="N", help="randomized search with N candidates")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel jobs (-1 = all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--export", action="store_true", help="also write the compact mmap artifact")
+    parser.add_argument("--export-only", action="store_true", help="only export the current model")
+    parser.add_argument("--max-depth", type=int, help="compact export: cap tree depth")
+    parser.add_argument("--value-bits", type=int, choices=(0, 8, 16), default=16,
+                        help="compact export: leaf value quantization (0 = float32)")
+    args = parser.parse_args()
+    train_and_save_model(args.csv, args.out, incremental=args.incremental, add_trees=args.add_trees,
+                         max_trees=args.max_trees, n_estimators=args.trees, search=args.search,
+                         jobs=args.jobs, chunk_rows=args.chunk_rows, export=args.export,
+                         export_only=args.export_only, max_depth=args.max_depth, value_bits=args.value_bits)
@@ -2,9 +2,19 @@ import os
 import math
 import joblib
 import random
+import numpy as np
 import pandas as pd
 from functools import lru_cache
 from datasets import load_dataset
+from food_index import FoodIndex, diet_key
+from diet_tags import VEG, VEGAN, diet_flags
+from food_snapshot import load_snapshot
+from catalog import read_catalog_frame
+from calorie_model import (CalorieModel, MODEL_PATH, MODEL_BACKEND, FLAT_MODEL_PATH,
+                           artifact_digest, load_flat_model, read_flat_meta)
+from metrics import span, MEAL_PICKS
+from portions import portion_items, totals_against
+from synthetic_foods import synthetic_food_frame
 
 # ----------------------------------------------------------------------
 # 1. ADVANCED CURATED MEAL DATABASE (Updated with Macros)
@@ -95,13 +105,41 @@ CURATED_DB = {
 # ----------------------------------------------------------------------
 # 2. MODEL LOADER
 # ----------------------------------------------------------------------
-def safe_load_model(path="models/calorie_model.pkl"):
+def compact_model_path():
+    """FLAT_MODEL_PATH if it was exported from the current MODEL_PATH pickle, else None."""
+    if MODEL_BACKEND == "sklearn" or not os.path.isdir(FLAT_MODEL_PATH):
+        return None
+    try:
+        digest = read_flat_meta(FLAT_MODEL_PATH).get("source_digest")
+        if os.path.exists(MODEL_PATH) and digest != artifact_digest(MODEL_PATH):
+            print("⚠️  Compact model was exported from a different calorie_model.pkl; ignoring it.")
+            return None
+    except Exception as e:
+        print(f"⚠️  Compact model unreadable ({e}); ignoring it.")
+        return None
+    return FLAT_MODEL_PATH
+
+
+def safe_load_model(path=None):
+    """
+    Load a CalorieModel (estimator + feature schema); None if unavailable.
+    path may be a pickle or a compact artifact directory; by default the
+    compact one is used when it is current.
+    """
+    path = path or compact_model_path() or MODEL_PATH
     if not os.path.exists(path):
         print(f"⚠️  Model not found at {path}. Skipping ML prediction.")
         return None
     try:
-        model = joblib.load(path)
-        print("✅ ML model loaded successfully.")
+        if os.path.isdir(path):
+            model = load_flat_model(path)
+            print(f"✅ Compact ML model mapped from {path} (features: {', '.join(model.features)}).")
+            return model
+        artifact = joblib.load(path)
+        model = CalorieModel.from_artifact(artifact)
+        backend = "flat" if model.fast is not None else "sklearn"
+        version = f"v{artifact.get('version', '?')}" if isinstance(artifact, dict) else "(legacy)"
+        print(f"✅ ML model {version} loaded successfully ({backend} backend, features: {', '.join(model.features)}).")
         return model
     except Exception as e:
         print(f"❌ Failed to load ML model: {e}")
@@ -110,77 +148,161 @@ def safe_load_model(path="models/calorie_model.pkl"):
 # ----------------------------------------------------------------------
 # 3. DATASET LOADER (UPDATED FOR MACROS)
 # ----------------------------------------------------------------------
+# Built by `python food_snapshot.py`; overridable for offline runs/tests.
+FOOD_SNAPSHOT_PATH = os.environ.get(
+    "FITFUEL_FOOD_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "food_snapshot"),
+)
+# Hugging Face dataset name, or "synthetic:ROWS[:VARIANT[:SEED]]" for the
+# offline stand-in in synthetic_foods.py (load tests, no hub access).
+FOOD_DATASET = os.environ.get("FITFUEL_FOOD_DATASET", "adarshzolekar/foods-nutrition-dataset")
+
+
+def synthetic_dataset(spec):
+    """Raw synthetic food dataframe for a "synthetic:ROWS[:VARIANT[:SEED]]" spec."""
+    parts = spec.split(":")[1:]
+    rows, variant, seed = parts + ["hf", "0"][len(parts) - 1:]
+    return synthetic_food_frame(int(rows), seed=int(seed), variant=variant)
+
+
 @lru_cache(maxsize=1)
 def load_food_dataframe():
-    dataset_name = "adarshzolekar/foods-nutrition-dataset"
+    dataset_name = FOOD_DATASET
     try:
-        print("⏳ Loading food dataset...")
-        ds = load_dataset(dataset_name)
-        df = pd.DataFrame(ds["train"])
-
-        # Normalize columns
-        df.columns = [c.lower().strip() for c in df.columns]
-        
-        # Name handling
-        possible_names = ['name', 'food_name', 'item', 'description', 'shrt_desc', 'desc']
-        found_col = None
-        for candidate in possible_names:
-            if candidate in df.columns:
-                found_col = candidate
-                break
-        
-        if found_col:
-            df.rename(columns={found_col: "food"}, inplace=True)
-        elif "food" not in df.columns:
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    df.rename(columns={col: "food"}, inplace=True)
-                    break
-
-        # Standardize Calories
-        if "calories" in df.columns:
-            df["calories"] = pd.to_numeric(df["calories"], errors="coerce").fillna(0)
-        
-        # --- NEW: Try to standardize Macros if columns exist ---
-        # Look for protein, carb, fat columns and standardize them to p, c, f
-        for col in df.columns:
-            if "prot" in col: df.rename(columns={col: "p"}, inplace=True)
-            if "carb" in col: df.rename(columns={col: "c"}, inplace=True)
-            if "fat" in col and "sat" not in col: df.rename(columns={col: "f"}, inplace=True) # Avoid saturated fat
-
-        # Ensure columns exist, fill with 0 if missing
-        for macro in ['p', 'c', 'f']:
-            if macro not in df.columns:
-                df[macro] = 0.0
+        print(f"⏳ Loading food dataset ({dataset_name})...")
+        with span("load_food_dataframe"):
+            if dataset_name.startswith("synthetic:"):
+                raw = synthetic_dataset(dataset_name)
             else:
-                df[macro] = pd.to_numeric(df[macro], errors="coerce").fillna(0)
-
-        # Create is_veg
-        if "is_veg" not in df.columns:
-            nonveg_keywords = "chicken|egg|fish|mutton|beef|pork|shrimp|prawn|salmon|tuna|bacon|ham|sausage"
-            try:
-                df["is_veg"] = ~df["food"].str.contains(nonveg_keywords, case=False, na=False)
-                df["is_veg"] = df["is_veg"].astype(int)
-            except:
-                df["is_veg"] = 1 
-
+                raw = pd.DataFrame(load_dataset(dataset_name)["train"])
+            df = normalize_food_dataframe(raw)
         print("✅ Food dataset loaded.")
         return df
     except Exception as e:
         print(f"❌ Could not load HF dataset: {e}")
         return None
 
+
+def normalize_food_dataframe(df):
+    """Rename/convert raw dataset columns to food, calories, p, c, f, is_veg and diet_flags."""
+    # Normalize columns
+    df.columns = [c.lower().strip() for c in df.columns]
+    
+    # Name handling
+    possible_names = ['name', 'food_name', 'item', 'description', 'shrt_desc', 'desc']
+    found_col = None
+    for candidate in possible_names:
+        if candidate in df.columns:
+            found_col = candidate
+            break
+    
+    if found_col:
+        df.rename(columns={found_col: "food"}, inplace=True)
+    elif "food" not in df.columns:
+        for col in df.columns:
+            if pd.api.types.is_string_dtype(df[col]):  # object, or pandas 3's str dtype
+                df.rename(columns={col: "food"}, inplace=True)
+                break
+
+    # Standardize Calories
+    if "calories" in df.columns:
+        df["calories"] = pd.to_numeric(df["calories"], errors="coerce").fillna(0)
+    
+    # --- NEW: Try to standardize Macros if columns exist ---
+    # Look for protein, carb, fat columns and standardize them to p, c, f
+    for col in df.columns:
+        if "prot" in col: df.rename(columns={col: "p"}, inplace=True)
+        if "carb" in col: df.rename(columns={col: "c"}, inplace=True)
+        if "fat" in col and "sat" not in col: df.rename(columns={col: "f"}, inplace=True) # Avoid saturated fat
+
+    # Ensure columns exist, fill with 0 if missing
+    for macro in ['p', 'c', 'f']:
+        if macro not in df.columns:
+            df[macro] = 0.0
+        else:
+            df[macro] = pd.to_numeric(df[macro], errors="coerce").fillna(0)
+
+    # Diet tags (diet_tags bit flags); a dataset-provided is_veg == 0 wins
+    if "food" in df.columns:
+        flags = diet_flags(df["food"])
+    else:
+        flags = np.full(len(df), VEG | VEGAN, dtype=np.uint8)
+    if "is_veg" in df.columns:
+        labelled_nonveg = pd.to_numeric(df["is_veg"], errors="coerce").fillna(1).to_numpy() == 0
+        flags[labelled_nonveg] &= np.uint8(~(VEG | VEGAN) & 0xFF)
+    df["diet_flags"] = flags
+    df["is_veg"] = ((flags & VEG) > 0).astype(int)
+
+    return df
+
+
+@lru_cache(maxsize=1)
+def load_food_index():
+    """
+    Load the diet-partitioned FoodIndex once per process. A local snapshot
+    (see food_snapshot.py) is memory-mapped when present; otherwise the index
+    is built from the food catalog's dataset/custom foods (see catalog.py),
+    then from the Hugging Face dataset. Empty if none is available.
+    """
+    if os.path.isdir(FOOD_SNAPSHOT_PATH):
+        try:
+            with span("load_food_snapshot"):
+                index = load_snapshot(FOOD_SNAPSHOT_PATH)
+            print(f"✅ Food snapshot mapped from {FOOD_SNAPSHOT_PATH} ({len(index)} foods).")
+            return index
+        except Exception as e:
+            print(f"❌ Could not read food snapshot: {e}")
+    df = None
+    try:
+        with span("load_food_catalog"):
+            df = read_catalog_frame()
+        if df is not None:
+            print(f"✅ Food catalog loaded ({len(df)} foods).")
+    except Exception as e:
+        print(f"❌ Could not read food catalog: {e}")
+    if df is None:
+        df = load_food_dataframe()
+    with span("build_food_index"):
+        return FoodIndex.from_dataframe(df)
+
 # ----------------------------------------------------------------------
-# 4. MACROS CALCULATION (TARGETS)
+# 4. ENERGY & MACROS CALCULATION (TARGETS)
 # ----------------------------------------------------------------------
+# (protein, carbs, fat) share of calories per goal
+MACRO_SPLITS = {
+    "fat loss":    (0.35, 0.35, 0.30), # High protein
+    "muscle gain": (0.30, 0.45, 0.25),
+    "maintenance": (0.20, 0.50, 0.30), # Adjusted maintenance to be more realistic standard
+}
+
+def activity_factor(activity):
+    activity = str(activity).lower()
+    if "sedentary" in activity: return 1.2
+    elif "light" in activity: return 1.375
+    elif "moderate" in activity: return 1.55
+    elif "very" in activity: return 1.725
+    elif "extra" in activity: return 1.9
+    return 1.2
+
+def goal_adjustment(goal):
+    goal = str(goal).lower()
+    if "fat" in goal: return -300
+    elif "muscle" in goal: return 300
+    return 0
+
+def calculate_tdee(weight, height, age, gender, activity, goal):
+    """Mifflin–St Jeor BMR x activity factor, adjusted for goal (min 1200 kcal)."""
+    if gender.lower().startswith("m"):
+        bmr = 10 * weight + 6.25 * height - 5 * age + 5
+    else:
+        bmr = 10 * weight + 6.25 * height - 5 * age - 161
+
+    tdee = int(bmr * activity_factor(activity)) + goal_adjustment(goal)
+    return max(1200, tdee)
+
 def calculate_macros(total_calories, goal="maintenance"):
     goal = goal.lower()
-    splits = {
-        "fat loss":    (0.35, 0.35, 0.30), # High protein
-        "muscle gain": (0.30, 0.45, 0.25),
-        "maintenance": (0.20, 0.50, 0.30), # Adjusted maintenance to be more realistic standard
-    }
-    p_pct, c_pct, f_pct = splits.get(goal, splits["maintenance"])
+    p_pct, c_pct, f_pct = MACRO_SPLITS.get(goal, MACRO_SPLITS["maintenance"])
     return {
         "protein_g": round(total_calories * p_pct / 4, 1),
         "carbs_g":   round(total_calories * c_pct / 4, 1),
@@ -190,154 +312,138 @@ def calculate_macros(total_calories, goal="maintenance"):
 # ----------------------------------------------------------------------
 # 5. MEAL PLAN GENERATOR (UPDATED TO CALCULATE MEAL MACROS)
 # ----------------------------------------------------------------------
-def pick_from_curated(diet_pref, meal_type, target_kcal):
-    """
-    Picks a meal and SCALES the protein/carbs/fats based on calories.
-    """
+MEAL_WEIGHTS = {"Breakfast": 0.25, "Lunch": 0.35, "Dinner": 0.30, "Snacks": 0.10}
+
+def _curated_key(diet_pref):
     diet_key = "veg"
     if "non" in diet_pref.lower(): diet_key = "non-veg"
     elif "vegan" in diet_pref.lower(): diet_key = "vegan"
-    
-    options = CURATED_DB.get(diet_key, {}).get(meal_type, [])
-    
-    # Fallback if list empty
-    if not options:
-        return {
-            "name": "Healthy Choice", 
-            "calories": target_kcal, 
-            "protein": int(target_kcal * 0.2 / 4), # Estimate
-            "carbs": int(target_kcal * 0.5 / 4),
-            "fats": int(target_kcal * 0.3 / 9),
-            "portion": "1 serving"
-        }
-
-    choice = random.choice(options)
-    
-    # Calculate Ratio to scale the portion
-    # If target is 600 and food is 300, ratio is 2.0 (2 servings)
-    ratio = target_kcal / choice["calories"]
-    
-    # Determine Portion Text
-    if 0.8 <= ratio <= 1.2:
-        portion = "1 Serving"
-        display_ratio = 1.0
-    elif ratio > 1.2:
-        display_ratio = 1.5 # simplify to 1.5x mostly
-        portion = f"1.5 Servings"
-    else:
-        display_ratio = 0.75
-        portion = "Small Portion (0.75)"
+    return diet_key
 
-    # Final Scaled Values
-    final_kcal = int(choice["calories"] * display_ratio)
-    final_p = int(choice.get("p", 0) * display_ratio)
-    final_c = int(choice.get("c", 0) * display_ratio)
-    final_f = int(choice.get("f", 0) * display_ratio)
+def curated_serving(choice):
+    """Per-serving [kcal, p, c, f] and serving weight (g, NaN if unknown) of a CURATED_DB entry."""
+    values = [choice["calories"], choice.get("p", 0), choice.get("c", 0), choice.get("f", 0)]
+    return values, choice.get("g", math.nan)
 
-    return {
-        "name": choice["name"], 
-        "calories": final_kcal,
-        "protein": final_p,
-        "carbs": final_c,
-        "fats": final_f,
-        "portion": portion
-    }
+def fallback_serving(target_kcal):
+    """Estimated per-serving values used when a meal has no options at all."""
+    return [target_kcal, target_kcal * 0.2 / 4, target_kcal * 0.5 / 4, target_kcal * 0.3 / 9]
 
-def pick_foods_for_calories(df, target_kcal, diet_pref, meal_type):
+def choose_food(index, target_kcal, diet_pref, meal_type, rng=random):
+    """
+    (name, per-serving [kcal, p, c, f], serving grams) for one meal, before
+    portioning. `rng` is anything with random()/choice() (the random module
+    or a seeded Random).
+    """
     # 60% chance to use Curated (Higher quality data)
-    if random.random() > 0.4:
-        return [pick_from_curated(diet_pref, meal_type, target_kcal)]
+    if rng.random() > 0.4 or index is None or index.size(diet_pref) == 0:
+        MEAL_PICKS.inc(source="curated")
+        return curated_choice(diet_pref, meal_type, target_kcal, rng)
 
-    if df is None or df.empty or "calories" not in df.columns:
-        return [pick_from_curated(diet_pref, meal_type, target_kcal)]
+    MEAL_PICKS.inc(source="dataset")
+    best = index.nearest(diet_pref, target_kcal, k=20)
+    choice = index.row(rng.choice(best))
+    return choice["name"], [choice["calories"], choice["p"], choice["c"], choice["f"]], math.nan
 
-    candidates = df[df["calories"] <= target_kcal * 1.1]
-    if candidates.empty: candidates = df
+def curated_choice(diet_pref, meal_type, target_kcal, rng=random):
+    """(name, per-serving [kcal, p, c, f], serving grams) of a random CURATED_DB option."""
+    options = CURATED_DB.get(_curated_key(diet_pref), {}).get(meal_type, [])
+    if not options:
+        return "Healthy Choice", fallback_serving(target_kcal), math.nan
+    choice = rng.choice(options)
+    return (choice["name"], *curated_serving(choice))
 
-    try:
-        candidates = candidates.copy() # Avoid settingoncopy warning
-        candidates["diff"] = abs(candidates["calories"] - target_kcal)
-        best = candidates.nsmallest(20, "diff")
-        if best.empty: raise Exception("No match")
-        
-        choice = best.sample(1).iloc[0]
-        
-        # Grab macros from DF if they exist, else 0
-        p = int(choice["p"]) if "p" in choice else 0
-        c = int(choice["c"]) if "c" in choice else 0
-        f = int(choice["f"]) if "f" in choice else 0
-        
-        return [{
-            "name": str(choice["food"]).title(),
-            "calories": int(choice["calories"]),
-            "protein": p,
-            "carbs": c,
-            "fats": f,
-            "portion": "1 Serving"
-        }]
-    except:
-        return [pick_from_curated(diet_pref, meal_type, target_kcal)]
-
-
-def get_meal_plan(target_calories, diet_pref="Veg", goal="maintenance"):
-    df = load_food_dataframe()
-    diet_pref = diet_pref.lower()
-    
-    df_filtered = None
-    if df is not None:
-        df_filtered = df.copy()
-        if diet_pref == "veg" and "is_veg" in df_filtered.columns:
-            df_filtered = df_filtered[df_filtered["is_veg"] == 1]
-        elif diet_pref == "vegan":
-            df_filtered = df_filtered[~df_filtered["food"].str.contains("milk|cheese|egg|butter|yogurt|cream", case=False, na=False)]
-
-    weights = {"Breakfast": 0.25, "Lunch": 0.35, "Dinner": 0.30, "Snacks": 0.10}
-    plan = {}
-    
-    total_plan_p = 0
-    total_plan_c = 0
-    total_plan_f = 0
-
-    for meal_name, weight in weights.items():
-        meal_kcal = int(target_calories * weight)
-        items = pick_foods_for_calories(df_filtered, meal_kcal, diet_pref, meal_name)
-        
-        # Accumulate totals to check later if you want
-        for item in items:
-            total_plan_p += item.get("protein", 0)
-            total_plan_c += item.get("carbs", 0)
-            total_plan_f += item.get("fats", 0)
-            
-        plan[meal_name] = items
-
-    # Optional: You could return these totals to the frontend to show "Actual vs Target"
-    return plan
+def pick_from_curated(diet_pref, meal_type, target_kcal, rng=random):
+    """
+    Picks a meal and SCALES the protein/carbs/fats based on calories.
+    `rng` is anything with random()/choice() (the random module or a seeded Random).
+    """
+    name, values, grams = curated_choice(diet_pref, meal_type, target_kcal, rng)
+    # If target is 600 and food is 300, that's 2 servings
+    items, _ = portion_items([name], [values], [target_kcal], [grams])
+    return items[0]
+
+def pick_foods_for_calories(index, target_kcal, diet_pref, meal_type, rng=random):
+    name, values, grams = choose_food(index, target_kcal, diet_pref, meal_type, rng)
+    items, _ = portion_items([name], [values], [target_kcal], [grams])
+    return items
+
+
+def build_meal_plan(target_calories, macros, diet_pref="Veg", index=None, rng=None):
+    """
+    (plan, totals): one item per meal for the day, every meal portioned in a
+    single portion_items() pass, with totals against the calculate_macros
+    targets. `index` is the FoodIndex to pick dataset foods from; when
+    omitted the shared one is loaded (blocking on first use). Pass a seeded
+    random.Random as `rng` for a reproducible plan.
+    """
+    index = load_food_index() if index is None else index
+    rng = random if rng is None else rng
+    diet = diet_key(diet_pref)
+
+    meal_names = list(MEAL_WEIGHTS)
+    targets = [int(target_calories * MEAL_WEIGHTS[meal_name]) for meal_name in meal_names]
+    picks = [choose_food(index, meal_kcal, diet, meal_name, rng) for meal_name, meal_kcal in zip(meal_names, targets)]
+    names, values, grams = zip(*picks)
+
+    items, scaled = portion_items(names, values, targets, grams)
+    plan = {meal_name: [item] for meal_name, item in zip(meal_names, items)}
+    return plan, totals_against(scaled, target_calories, macros)
+
+
+def get_meal_plan(target_calories, diet_pref="Veg", goal="maintenance", index=None, rng=None):
+    """The plan half of build_meal_plan(), with targets from calculate_macros(goal)."""
+    return build_meal_plan(target_calories, calculate_macros(target_calories, goal), diet_pref, index, rng)[0]
+
+def plan_totals(plan, target_calories, macros):
+    """Actual vs target calories/macros for a plan (for the "Actual vs Target" view)."""
+    items = [item for meal in plan.values() for item in meal]
+    values = [[item.get("calories", 0), item.get("protein", 0), item.get("carbs", 0), item.get("fats", 0)] for item in items]
+    return totals_against(values, target_calories, macros)
 
 # ----------------------------------------------------------------------
 # 6. INPUT VALIDATION
 # ----------------------------------------------------------------------
+def coerce_number(value, kind=float):
+    """
+    Form text or a JSON number as int/float. Raises TypeError/ValueError for
+    anything else (JSON true, lists, objects) and for non-integral ints.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise TypeError(f"expected a number, got {type(value).__name__}")
+    if kind is int and isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"expected a whole number, got {value}")
+    return kind(value)
+
+
 def validate_inputs(form):
+    """(data, errors) for /predict fields from a form or a JSON object; every field is type-checked."""
     data, errors = {}, {}
     def get(k): return form.get(k)
 
     try:
-        data["age"] = int(get("age"))
+        data["age"] = coerce_number(get("age"), int)
         if not (10 <= data["age"] <= 100): errors["age"] = "Age 10-100"
-    except: errors["age"] = "Invalid age"
+    except (TypeError, ValueError): errors["age"] = "Invalid age"
 
     try:
-        data["height"] = float(get("height"))
+        data["height"] = coerce_number(get("height"))
         if not (50 <= data["height"] <= 300): errors["height"] = "Height realistic"
-    except: errors["height"] = "Invalid height"
+    except (TypeError, ValueError): errors["height"] = "Invalid height"
 
     try:
-        data["weight"] = float(get("weight"))
+        data["weight"] = coerce_number(get("weight"))
         if not (20 <= data["weight"] <= 500): errors["weight"] = "Weight realistic"
-    except: errors["weight"] = "Invalid weight"
+    except (TypeError, ValueError): errors["weight"] = "Invalid weight"
 
-    data["gender"] = get("gender") or "Male"
-    data["activity"] = get("activity") or "Sedentary"
-    data["goal"] = get("goal") or "Maintenance"
-    data["diet"] = get("diet") or "Veg"
+    # Text fields: JSON bodies can carry any type here, forms only strings
+    for field, default in (("gender", "Male"), ("activity", "Sedentary"), ("goal", "Maintenance"), ("diet", "Veg")):
+        value = get(field)
+        if value is None or value == "":
+            data[field] = default
+        elif isinstance(value, str):
+            data[field] = value
+        else:
+            errors[field] = f"Invalid {field}"
 
-    return data, errors
\ No newline at end of file
+    return data, errors
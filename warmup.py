@@ -0,0 +1,64 @@
+import os
+import time
+import threading
+
+# ----------------------------------------------------------------------
+# BACKGROUND WARM-UP
+# ----------------------------------------------------------------------
+# Loads slow resources (model, food index) in a daemon thread when a worker
+# starts, so the first request never waits on them. Until a component is
+# ready, get() returns None and callers serve their fallback.
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class Warmup:
+    def __init__(self, loaders):
+        # name -> zero-argument callable, run in insertion order
+        self.loaders = dict(loaders)
+        self.values = {}
+        self.status = {name: {"state": PENDING, "seconds": None, "error": None} for name in self.loaders}
+        self.started_at = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start loading in the background; safe to call on every request."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            # Threads don't survive fork (e.g. gunicorn --preload): restart per process
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.started_at = time.time()
+            threading.Thread(target=self._run, name="fitfuel-warmup", daemon=True).start()
+
+    def _run(self):
+        for name, loader in self.loaders.items():
+            status = self.status[name]
+            status["state"] = LOADING
+            start = time.perf_counter()
+            try:
+                self.values[name] = loader()
+                status["state"] = READY
+            except Exception as e:
+                print(f"❌ Warm-up of {name} failed: {e}")
+                status["state"] = FAILED
+                status["error"] = str(e)
+            status["seconds"] = round(time.perf_counter() - start, 3)
+
+    def get(self, name):
+        return self.values.get(name) if self.status[name]["state"] == READY else None
+
+    @property
+    def ready(self):
+        """True once every component finished loading (successfully or not)."""
+        return all(s["state"] in (READY, FAILED) for s in self.status.values())
+
+    def report(self):
+        return {
+            "ready": self.ready,
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 3) if self.started_at else None,
+            "components": {name: dict(status) for name, status in self.status.items()},
+        }